@@ -11,17 +11,23 @@ interacts with IRIS through a Tkinter-based GUI.
 #Created By Archit Roy
 
 #importing libraries and modules
-import pyaudio #audio input output
-import wave #reading, writing .wav files
+import asyncio #runs the conversation stages concurrently
 import time #time related operations
+launched = time.perf_counter() #start of the app, for the startup report
 import threading #for multithreading like tinker window simultaneously
-import whisper # audio to text transcription
-from pynput import keyboard #interacting with keyboard, listed to Enter etc
-import google.generativeai as palm #generate content
-from gtts import gTTS #text to speach
-from pydub import AudioSegment #for audio processing such as increaing speed to make it more humane
-import os #interact with os such as delete file after creation
-import pygame # audio playback
+import collections #deque to hold a little audio from before speech starts
+import os #cache folder in the home directory
+import queue #GUI updates from other threads
+from iris_audio import CaptureEngine, EnergyVAD, frames_to_whisper, pcm16_to_float, write_wav # in memory audio conversion for whisper
+from iris_stt import whisper_registry, StreamingTranscriber, DEFAULT_MODEL, DEFAULT_THREADS # resident whisper model for audio to text transcription
+from iris_llm import make_backend # pluggable, streaming LLM backends
+from iris_tts import SpeechCache, SpeechPipeline # sentence by sentence text to speech and playback
+from iris_examples import ExampleIndex # picks the most relevant few-shot examples
+from iris_persona import examples, iris_context_prompt # who iris is, custom set examples
+from iris_context import ConversationContext # token bounded conversation history
+from iris_metrics import LatencyRecorder # per stage latency of every turn
+from iris_orchestrator import ConversationOrchestrator # pipelined conversation loop with barge-in
+from iris_startup import WarmUp # loads whisper, mic, mixer and llm in parallel while the GUI is up
 import tkinter as tk #for GUI
 
 
@@ -33,10 +39,13 @@ class VirtualAssistantApp:
     GUI application for IRIS. It provides a chat screen
     and a microphone button for user interaction.
     """
-    def __init__(self, root):
+    def __init__(self, root, max_lines=2000, update_ms=50, metrics=None):
         #inint is conctructor of class, initialise VirtualAssistantApp object with the provided root parameter, which is the main Tkinter window.
         #Initializes the VirtualAssistantApp Parameters:
         #-root: The root window of the Tkinter application.
+        #-max_lines: scrollback of the chat screen, older lines are trimmed, None keeps everything
+        #-update_ms: how often queued updates are applied to the chat screen
+        #-metrics: LatencyRecorder that times every batch applied as gui_update, None records nothing
         self.root = root
         self.root.title("IRIS - Virtual Conversational Assistant")
 
@@ -54,6 +63,15 @@ class VirtualAssistantApp:
         self.root.bind('<Return>', lambda event: self.toggle_mic())
         #bind to event to a function like here <return> is for pressing ENTER key
 
+        #tkinter is not thread safe, other threads only queue updates and the tk thread applies them in batches
+        self.max_lines = max_lines
+        self.update_ms = update_ms
+        self.metrics = metrics
+        self.updates = queue.SimpleQueue()
+        self.tag_colors = {} #speaker tag -> color it is configured with
+        self.chat_screen.tag_configure("partial_tentative", foreground="grey")
+        self.root.after(self.update_ms, self.drain_updates)
+
     def toggle_mic(self):
         #Toggle mic status ON,OFF 
         self.mic_active = not self.mic_active
@@ -64,94 +82,222 @@ class VirtualAssistantApp:
         mic_status = "ON" if self.mic_active else "OFF"
         self.mic_button['fg'] = "red" if mic_status == "ON" else "black"
 
+    def show_partial(self, speaker, committed, tentative=""):
+        #live transcript while the user is still speaking, safe to call from any thread
+        #committed text is shown normally, tentative text (may still change) in grey
+        self.updates.put(("partial", speaker, committed, tentative))
+
+    def clear_partial(self):
+        #remove the live transcript line, safe to call from any thread
+        self.updates.put(("clear_partial",))
+
     def send_message(self, speaker, text, color="black"):
-        #display message in GUI
+        #display message in GUI, safe to call from any thread
         #speaker:User or IRIS
         #text: content
         #color: default black for user, blue for iris
-        self.chat_screen.configure(state='normal')
-        self.chat_screen.tag_configure(speaker, foreground=color)
-        message = f"{speaker}: {text}\n"
-        self.chat_screen.insert('end', '\n')
-        self.chat_screen.insert('end', message, (speaker,))
-        self.chat_screen.configure(state='disabled')
+        self.updates.put(("message", speaker, text, color))
+
+    def drain_updates(self):
+        #runs on the tk thread every update_ms and applies everything queued since the last run
+        updates = []
+        try:
+            while True:
+                updates.append(self.updates.get_nowait())
+        except queue.Empty:
+            pass
+        try:
+            if updates and self.metrics is not None:
+                with self.metrics.measure("gui_update"):
+                    self.apply_updates(updates)
+            elif updates:
+                self.apply_updates(updates)
+        except tk.TclError as e:
+            print("Error updating the chat screen:", str(e))
+        finally:
+            self.root.after(self.update_ms, self.drain_updates) #one bad batch must not freeze the screen
+
+    def apply_updates(self, updates):
+        #one edit of the chat screen for a whole batch
+        #every update replaces the live transcript line, so only the last one can leave a partial on screen
+        #and the messages all go in with a single insert
+        screen = self.chat_screen
+        screen.configure(state='normal')
+        if "partial_start" in screen.mark_names():
+            screen.delete("partial_start", 'end-1c')
+            screen.mark_unset("partial_start")
+        chunks = []
+        for update in updates:
+            if update[0] != "message":
+                continue
+            _, speaker, text, color = update
+            if self.tag_colors.get(speaker) != color:
+                screen.tag_configure(speaker, foreground=color)
+                self.tag_colors[speaker] = color
+            chunks += ['\n', (), f"{speaker}: {text}\n", (speaker,)]
+        if chunks:
+            screen.insert('end', *chunks)
+        if updates[-1][0] == "partial":
+            _, speaker, committed, tentative = updates[-1]
+            screen.mark_set("partial_start", "end-1c")
+            screen.mark_gravity("partial_start", "left")
+            screen.insert('end', f"\n{speaker}: {committed} ", ("partial",), tentative, ("partial", "partial_tentative"))
+        if self.max_lines:
+            lines = int(screen.index('end-1c').split('.')[0])
+            if lines > self.max_lines:
+                screen.delete('1.0', f"{lines - self.max_lines + 1}.0") #drop the oldest lines
+        screen.see('end')
+        screen.configure(state='disabled')
 
 
 
 # to record the audio
 class VoiceRecorder:
     """
-    The VoiceRecorder class handles audio recording, saving, and transcription.
+    The VoiceRecorder class handles audio recording and transcription.
+    Captured audio is handed to Whisper in memory, saving a .wav is only a debug option.
+    In streaming mode the audio is transcribed while the user is still speaking.
+    With a voice activity detector silence is dropped before transcription and,
+    if silence_timeout is set, recording stops by itself once the user has been quiet that long.
     """
-    def __init__(self):
+    def __init__(self, engine, debug_wav=None, streaming=False, on_partial=None, vad=None, silence_timeout=1.2, hands_free=False,
+                 on_speech_start=None):
         #Initializes a VoiceRecorder object with default values.
+        #engine: CaptureEngine that owns the microphone for the whole session
+        #debug_wav: optional path to also save each recording as a .wav file
+        #streaming: transcribe in the background while recording
+        #on_partial: called with (committed, tentative) text as the streaming transcript grows
+        #vad: EnergyVAD used to skip silence and to auto stop, None records everything
+        #silence_timeout: seconds of silence after speech that end the recording (needs vad), None waits for Enter
+        #hands_free: no Enter key needed, recording starts right away and stops on silence
+        #on_speech_start: called once when the user starts talking (when recording starts if there is no vad)
         self.recording = False
-        self.audio_file = "voice_recording.wav"
+        self.engine = engine
+        self.rate = engine.rate
+        self.debug_wav = debug_wav
+        self.streaming = streaming
+        self.on_partial = on_partial
+        self.streamer = None
+        self.vad = vad
+        self.silence_timeout = silence_timeout
+        self.hands_free = hands_free
+        self.on_auto_stop = None #called from the recording thread when silence ends the recording
+        self.on_speech_start = on_speech_start
+        self.audio = None #16 kHz float32 array handed to whisper
         self.recording_thread = None
         print()
         print("**************************************************************")
         print()
-        print("press enter to start recording")
+        print("start speaking" if hands_free else "press enter to start recording")
         print()
 
     def start_recording(self):
         #start recording
         self.recording = True
-        self.frames = [] #store audio frames
+        self.kept = [] #(start, end) positions in the capture buffer that go to whisper
+        self.frames = [] #views of the kept audio, filled when recording ends
+        self.audio = None
+        if self.streaming:
+            self.streamer = StreamingTranscriber(rate=self.rate, on_partial=self.on_partial)
+        if self.vad is not None:
+            self.vad.reset()
         self.start_time = time.time()
         self.recording_thread = threading.Thread(target=self.record)
         self.recording_thread.start()
-        print("Recording started, Press Enter to stop recording.")
+        if self.vad is None and self.on_speech_start is not None:
+            self.on_speech_start()
+        if self.hands_free:
+            print("Listening, recording stops when you go quiet.")
+        else:
+            print("Recording started, Press Enter to stop recording.")
         print()
 
     def stop_recording(self):
         #stop recording
         self.recording = False
 
+    def wait_until_saved(self):
+        #wait for the recording thread to finish preparing the audio
+        if self.recording_thread is not None:
+            self.recording_thread.join()
+
     def record(self):
 
-        #Records audio using PyAudio and saves it to a WAV file. Also transcribes the audio using the Whisper library.
-        #Returns:- The transcribed text.
+        #Records audio from the capture engine and converts it to a 16 kHz array for whisper.
+        #Transcription is done once by the caller after the recording thread has finished.
 
-        audio = pyaudio.PyAudio()
-        stream = audio.open(format=pyaudio.paInt16, #indicates that each audio sample is represented as a 16-bit integer. This is a common format for audio recording and playback.
-                            channels=1,
-                            rate=48000,
-                            input=True,
-                            frames_per_buffer=1024) #The size of the buffer can affect the latency and performance of audio processing.
+        engine = self.engine
+        engine.start() #the device is already open, this only starts filling the buffer
         
+        #a few chunks from just before speech starts are kept so the first word is not clipped
+        preroll = collections.deque(maxlen=max(1, int(0.3 * self.rate / engine.chunk)))
         while self.recording:
-            data = stream.read(1024)
-            self.frames.append(data)
+            chunk = engine.read()
+            if chunk is None:
+                if engine.full:
+                    self.max_length_reached()
+                continue
+            if self.vad is None:
+                self.keep_chunk(*chunk)
+                continue
+            samples = pcm16_to_float(engine.ring.view(*chunk))
+            if self.vad.process(samples):
+                if not self.kept and self.on_speech_start is not None:
+                    self.on_speech_start() #first speech of this recording
+                while preroll:
+                    self.keep_chunk(*preroll.popleft())
+                self.keep_chunk(*chunk, samples)
+            else:
+                preroll.append(chunk) #silence, not sent to whisper
+            if self.silence_timeout is not None and self.vad.speech_seen and self.vad.silence >= self.silence_timeout:
+                #user stopped talking, end the recording without waiting for Enter
+                self.auto_stop()
             # self.update_timer()
         
-        stream.stop_stream()
-        stream.close()
-        audio.terminate()
-        #to save audio to transcribe it
-        self.save_audio()
-        return self.transcribe_audio()
-
-
-    def save_audio(self):
-        #save audio as .wav file
-        sound_file = wave.open(self.audio_file, "wb")
-        sound_file.setnchannels(1) #set autio to monaural(single channel) and not stereo(2 channel)
-        sound_file.setsampwidth(2) #num of bytes to represent each audio sample, more means more amplitude but larger file size
-        sound_file.setframerate(48000) #frame rate is crucial for determining the duration of the audio and the pitch of the sound. 
-        #normal=44100 but using more here for more clarity
-        sound_file.writeframes(b"".join(self.frames))
-        sound_file.close()
+        engine.stop()
+        self.frames = [engine.ring.view(start, end) for start, end in self.kept]
+        #convert in memory, no file and no ffmpeg needed
+        if self.streamer is None: #the streamer already has the audio
+            self.audio = frames_to_whisper(self.frames, self.rate)
+        if self.debug_wav:
+            self.save_audio()
         print()
         print("**************************************************************")
         print()
+
+
+    def auto_stop(self):
+        #end the recording from the recording thread
+        self.recording = False
+        if self.on_auto_stop is not None:
+            self.on_auto_stop()
+
+    def max_length_reached(self):
+        #the capture buffer is full, a forgotten Enter can't keep recording forever
+        print("Maximum recording length reached, recording stopped.")
+        self.auto_stop()
+
+    def keep_chunk(self, start, end, samples=None):
+        #keep one captured chunk for transcription, neighbouring chunks are merged into one range
+        if self.kept and self.kept[-1][1] == start:
+            self.kept[-1] = (self.kept[-1][0], end)
+        else:
+            self.kept.append((start, end))
+        if self.streamer is not None:
+            self.streamer.feed(pcm16_to_float(self.engine.ring.view(start, end)) if samples is None else samples)
+
+    def save_audio(self):
+        #debug only, save audio as .wav file
+        write_wav(self.debug_wav, self.frames, self.rate)
         
 
     def transcribe_audio(self):
         #using locally installed openai's opensource whisper to transcribe audio
-        model = whisper.load_model("base.en")# base model to keep it fast but accurate
-        result = model.transcribe(self.audio_file, language="en", fp16=False)
-        user_response = result["text"]
+        #the model is loaded once per process by whisper_registry and reused on every turn
+        if self.streamer is not None:
+            #most of it is already transcribed, only the tail is decoded now
+            return self.streamer.finish()
+        user_response = whisper_registry.transcribe(self.audio)
         # print("Transcription:", user_response)
         return user_response
 
@@ -161,8 +307,33 @@ class VoiceRecorder:
 # Function to handle voice recording and transcription
 #has error handeling as most error prone area of code like not preoperly recorded
 def record_and_transcribe():
+    return finish_transcription(capture_utterance())
+
+
+#recorder and keyboard listener of the capture in progress, so the conversation can end it
+active_capture = {}
+
+
+#records one utterance and returns the recorder once recording has ended, transcription is done by finish_transcription
+#on_speech_start is called when the user starts talking, the orchestrator uses it for barge-in
+def capture_utterance(on_speech_start=None):
     # Initialize VoiceRecorder object
-    voice_recorder = VoiceRecorder()
+    voice_recorder = VoiceRecorder(capture_engine, debug_wav=debug_wav, streaming=streaming_transcription,
+                                   on_partial=lambda committed, tentative: app.show_partial("YOU", committed, tentative),
+                                   vad=vad, silence_timeout=silence_timeout if hands_free else None, hands_free=hands_free,
+                                   on_speech_start=on_speech_start)
+    active_capture["recorder"] = voice_recorder
+
+    if hands_free:
+        #kiosk mode, no keyboard hook, the voice activity detector ends the recording
+        try:
+            voice_recorder.start_recording()
+            voice_recorder.wait_until_saved() #one utterance at a time, the next capture would reset the engine
+        except Exception as e:
+            print("Error starting recording:", str(e))
+            app.send_message("IRIS", "Sorry, I couldn't start recording. Please try again.", iris_color)
+            text_to_audio("Sorry, I couldn't start recording. Please try again.")
+        return voice_recorder
 
     # Callback function for the release of the Enter key
     def on_key_release(key):
@@ -188,21 +359,46 @@ def record_and_transcribe():
                     text_to_audio("Sorry, I couldn't stop recording. Please try again.")
 
     try:
+        from pynput import keyboard #interacting with keyboard, listed to Enter etc, imported by the warm up, fails without a display
         # Set up keyboard listener with the defined callback function
         with keyboard.Listener(on_release=on_key_release) as listener:
+            active_capture["listener"] = listener
+            voice_recorder.on_auto_stop = listener.stop #silence can end the recording before Enter is pressed
             listener.join()
     except Exception as e:
         # Handle and log any errors with the keyboard listener
         print("Error with keyboard listener:", str(e))
         app.send_message("IRIS", "Sorry, there was an issue with the keyboard listener. Please try again.", iris_color)
         text_to_audio("Sorry, there was an issue with the keyboard listener. Please try again.")
+        if isinstance(e, ImportError):
+            raise #no keyboard hook on this system (no display, wayland), trying again won't help
+
+    return voice_recorder
+
+
+#ends the capture in progress, the conversation is over and nobody will press Enter for it
+def stop_capture():
+    voice_recorder = active_capture.pop("recorder", None)
+    listener = active_capture.pop("listener", None)
+    if voice_recorder is not None:
+        voice_recorder.stop_recording()
+    if listener is not None:
+        listener.stop()
+
 
+#waits for the recording to end and transcribes it, same error handling for both recording modes
+def finish_transcription(voice_recorder):
     try:
-        # Transcribe the recorded audio
-        return voice_recorder.transcribe_audio()
+        # Transcribe the recorded audio, once the recording thread has saved it
+        voice_recorder.wait_until_saved()
+        text = voice_recorder.transcribe_audio()
+        if not text or not text.strip():
+            app.clear_partial() #nothing was heard, the turn is skipped so no message replaces the live line
+        return text
     except Exception as e:
         # Handle and log any errors during transcription
         print("Error during transcription:", str(e))
+        app.clear_partial()
         app.send_message("IRIS", "Sorry, there was an issue with transcription. Please try again.", iris_color)
         text_to_audio("Sorry, there was an issue with transcription. Please try again.")
 
@@ -210,231 +406,250 @@ def record_and_transcribe():
 
 #TTS
 #Converts text to audio and plays the generated speech with adjusted speed.
-def text_to_audio(text, speed=1.0):
-    # Initialize the gTTS object with the text
-    tts = gTTS(text)
-    # Check if the output file already exists and remove it
-    if os.path.exists("output.mp3"):
-        os.remove("output.mp3")
+#sentences are synthesized one ahead of playback, so speech starts after the first sentence is ready
+#rendered sentences are cached in memory and on disk, so repeated prompts skip synthesis
+tts_speed = 1.25 #session playback speed, faster speech sounds more humane
+tts_cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "iris", "tts")
+speech = None #made by start_warm_up, so importing this module doesn't touch the disk
+
+
+def make_speech():
+    return SpeechPipeline(speed=tts_speed, cache=SpeechCache(disk_dir=tts_cache_dir))
+
+#phrases IRIS says again and again, rendered once at startup
+fixed_phrases = [
+    "Goodbye dear friend",
+    "Sorry, I couldn't start recording. Please try again.",
+    "Sorry, I couldn't stop recording. Please try again.",
+    "Sorry, there was an issue with the keyboard listener. Please try again.",
+    "Sorry, there was an issue with transcription. Please try again.",
+]
 
-    # Save the generated speech to a file
-    tts.save("output.mp3")
+def text_to_audio(text, speed=None):
+    #speed: playback speed for this text only, None uses tts_speed
+    speech.speak(text, speed=speed)
 
-    # Use pydub to adjust the speech speed
-    audio = AudioSegment.from_mp3("output.mp3")
-    # Speed up the speech by the specified factor
-    audio = audio.speedup(playback_speed=1.25)
-    audio.export("output_fast.mp3", format="mp3")
 
-    # Initialize pygame mixer
-    pygame.mixer.init()
 
-    # Load and play the generated speech with adjusted speed
-    pygame.mixer.music.load("output_fast.mp3")
-    pygame.mixer.music.play()
 
-    # Wait for the speech to finish playing
-    while pygame.mixer.music.get_busy():
-        pygame.time.Clock().tick(10)
+iris_color='#2e5484' #same as tk logo blue for good fashion choice
+chat_scrollback_lines = 2000 #lines kept on the chat screen, long sessions don't grow without bound
+#initializes the Tkinter GUI, runs in its own thread so the conversation can go on
+def run_gui(shown):
+    #shown: threading.Event set once the window exists and app can take messages
+    root = tk.Tk()#create tk window
+    global app
+    app = VirtualAssistantApp(root, max_lines=chat_scrollback_lines, metrics=metrics)
+    app.send_message("IRIS", "Getting ready, one moment...", iris_color)
+    shown.set()
 
-    # Clean up by removing temp files
-    pygame.mixer.quit()
-    os.remove("output.mp3")
-    os.remove("output_fast.mp3")
+    root.mainloop()
 
 
+#microphone, opened once and kept open, with a fixed size buffer for the longest allowed recording
+mic_rate = 48000 #normal=44100 but using more here for more clarity
+max_recording_seconds = 60
+capture_engine = CaptureEngine(rate=mic_rate, chunk=1024, max_seconds=max_recording_seconds)
 
+#set to a path like "voice_recording.wav" to keep a copy of each recording for debugging
+debug_wav = None
 
-iris_color='#2e5484' #same as tk logo blue for good fashion choice
-#The main function that initializes the Tkinter GUI and starts the conversation with IRIS
-def main(): # put in main() so that threading can work 
-    root = tk.Tk()#create tk window
-    global app
-    app = VirtualAssistantApp(root)
-    app.send_message("IRIS", "Hi, I am Iris, your virtual friend, feel free to talk to me Press ENTER to Start,Stop Speaking",iris_color)
+#transcribe while the user is speaking so the text is ready right after they stop
+streaming_transcription = True
 
-    root.mainloop()
+#voice activity detection, drops silence before whisper and detects speech for barge-in
+#in hands free mode it also stops recording after silence_timeout seconds of quiet, with Enter only Enter stops it
+use_vad = True
+vad_energy_db = -45.0 #frames quieter than this (dBFS) are never speech, raise it in noisy rooms
+vad_hangover_ms = 300 #short pauses between words still count as speech
+silence_timeout = 1.2
+hands_free = False #True for kiosk use, no Enter key needed at all
+vad = EnergyVAD(mic_rate, energy_db=vad_energy_db, hangover_ms=vad_hangover_ms) if (use_vad or hands_free) else None
+
+#the user can talk over IRIS, new speech stops the reply
+barge_in = True
+barge_in_energy_db = -30.0 #while IRIS is talking the mic also hears the speakers, so only louder speech interrupts
 
+#whisper settings, size can be tiny.en, base.en, small.en... bigger is slower but more accurate
+#defaults come from IRIS_WHISPER_MODEL and IRIS_WHISPER_THREADS environment variables
+whisper_model_size = DEFAULT_MODEL
+whisper_threads = DEFAULT_THREADS #None lets torch pick
 
-gui_thread = threading.Thread(target=main) #need threading else code wont progress till tk window close, making it useless
-gui_thread.start()
-#A separate thread is created to run the Tkinter GUI concurrently with the main program.
-# This ensures that the program can continue execution while the GUI remains responsive.
+#startup, the GUI shows right away and everything slow is warmed up in parallel behind it
+parallel_startup = True #False warms up one task after another, only useful to compare startup times
+interactive_tasks = ("microphone", "keyboard") #the user can start talking once these are ready, whisper may still be loading
+warm_up = None
 
 
 
 
 key = 'ENTER_YOUR_KEY_HERE' #google palm api key for project, free trial avaible
-palm.configure(api_key=key)
 
 model_id = 'models/chat-bison-001'# good for conversation like here
 
-examples=[ #custom set examples
-
-    ('hi iris my project hit a deadend today','oh, tell me about it also how are you?'),
-    ('imm good, the project i was planing requires a paid api and im broke','have you tried looking for alternatives?'),
-    ('yes, they are good enough','maybe you need to take a break, and get back with a fresh perspective'),
-    ('yeah, ig you are right','yes, try going somewhare out and doing breathing excercises'),
-    ('yeah, will do that, thanks','your welcome, need any more help?'),
-
-    ("Hey, I've been feeling really stressed lately.", "I'm here for you. Can you talk about what's been causing you stress?"),
-    ("I have a lot of work piling up, and I'm overwhelmed.", "It's understandable to feel that way with a heavy workload. Let's break it down. What's the most pressing task?"),
-    ("I have a major presentation due next week, and I'm not prepared at all.", "I see. It's okay; we can work on a plan together. What's the topic of your presentation?"),
-    ("It's about climate change and its impact on our future.", "That's important. Let's start by outlining key points and gathering some resources. We can do this step by step."),
-    ("Thanks, I appreciate your support.", "You're welcome! I'm here to help. And remember, you're not alone in this."),
-
-    ("Hi, I've been feeling really down lately.", "I'm sorry to hear that. Would you like to talk about what's been bothering you?"),
-    ("I lost my job, and it's been tough to cope.", "Losing a job can be incredibly stressful. How are you feeling about it?"),
-    ("I feel like a failure, and it's affecting my self-esteem.", "I understand how you might feel that way, but remember, your worth isn't defined by your job. What are your strengths and passions?"),
-    ("I used to love painting, but I haven't done it in years.", "Painting sounds like a wonderful way to express yourself. Maybe it's time to reconnect with that passion."),
-    ("You're right. I should pick up my brushes again.", "I'm glad to hear you're considering it. I'm here to support you in any way I can."),
-
-    ("Hey, I've been having trouble sleeping lately.", "I'm here to help. Can you tell me what's been on your mind when you're trying to sleep?"),
-    ("I can't stop thinking about my past mistakes and regrets.", "It's common to dwell on the past, but it's important to learn from it and let go. What are some things you're proud of in your life?"),
-    ("I've accomplished a lot, but these regrets just haunt me.", "It's natural to have regrets, but they don't define your worth. Maybe writing down your regrets and reflecting on them could help."),
-    ("I'll give that a try. Thanks for listening.", "You're welcome. Remember, I'm here whenever you need to talk or share your thoughts."),
-
-    ("Hi, I'm going through a tough breakup.", "I'm here for you. Breakups can be really challenging. How are you feeling about it?"),
-    ("I feel heartbroken and lost without them.", "Heartbreak is a painful experience. It's okay to grieve. Have you talked to friends or family about it?"),
-    ("I have, but I still miss them so much.", "It's natural to miss someone you cared about. Over time, the pain will lessen. What are some self-care activities that you enjoy?"),
-    ("I used to love hiking. Maybe I should go on a hike this weekend.", "Hiking sounds like a great idea! Nature can be very healing. I hope it helps you find some peace."),
-
-    ("Hi, I've been feeling really overwhelmed with work lately.", "I'm here for you. Tell me more about the tasks that are stressing you out."),
-    ("I have so many deadlines, and I can't seem to catch up.", "It sounds like you're under a lot of pressure. Have you tried prioritizing your tasks to manage your workload?"),
-    ("I've tried, but it's still too much to handle.", "I understand. Sometimes it's helpful to break things into smaller, manageable steps. What's the most urgent deadline you're facing?"),
-    ("I have a major report due by the end of the week.", "That does sound urgent. Let's start by outlining the key points for your report. We can work through it together."),
-    ("Thank you for your support; it means a lot.", "You're welcome! I'm here to help. Remember, taking one step at a time can make things more manageable."),
-
-    ("Hey, I've been struggling with a personal issue and could use someone to talk to.", "I'm here to listen. Feel free to share what's on your mind, and I'll do my best to support you."),
-    ("I've been feeling isolated and disconnected from my friends.", "Feeling isolated can be tough. Have you considered reaching out to your friends and letting them know how you feel?"),
-    ("I'm worried they won't understand or won't have time for me.", "It's natural to have such concerns, but true friends often appreciate your honesty. Give it a try; you might be surprised by their support."),
-    ("You're right. I'll try talking to them and opening up.", "I'm glad to hear you're willing to give it a try. Remember, I'm here for you as well, anytime you need to talk."),
-
-    ("Hello, I've been feeling anxious about an upcoming job interview.", "I understand how job interviews can be nerve-wracking. What's causing you the most anxiety about this interview?"),
-    ("I'm afraid I'll mess up and not get the job.", "It's common to have such fears. Let's work on boosting your confidence. Have you practiced answering common interview questions?"),
-    ("I've practiced, but I still feel unprepared.", "That's okay; we can work on your responses and preparation. Would you like to go over some key interview questions together?"),
-    ("Yes, that would be helpful. I appreciate your support.", "You're welcome! We can do a mock interview to help you gain more confidence. Remember, you have valuable skills to offer."),
-
-    ("Hi, I'm going through a breakup, and it's been really hard.", "I'm here to support you during this difficult time. Would you like to share what's been bothering you about the breakup?"),
-    ("I miss my ex a lot, and I'm feeling very lonely.", "It's completely normal to miss someone you cared about. Have you considered spending time with friends or family for support?"),
-    ("I have, but the loneliness still lingers.", "Loneliness can be challenging. It might help to focus on self-care activities and personal growth. What are some things you enjoy doing for yourself?"),
-    ("I used to love playing the guitar; maybe I should pick it up again.", "That sounds like a great idea! Reconnecting with your passions can be very healing. I'm here to encourage and support you."),
-
-    ("Hey, I've been feeling really stressed out lately with work and personal issues.", "I'm here to listen and support you. Let's start by talking about what's been on your mind. What's been stressing you out at work?"),
-    ("Work has been incredibly demanding, and I'm constantly juggling multiple projects.", "That sounds overwhelming. Have you discussed your workload with your manager? It's important to ensure a healthy work-life balance."),
-    ("I haven't yet, but I'll consider having that conversation soon.", "It's a positive step to consider addressing your work-related stress. In the meantime, is there anything specific about your personal issues that's been bothering you?"),
-    ("I've been going through a rough patch in my relationship, and it's been affecting my mood.", "Relationship challenges can be emotionally taxing. Have you tried having an open and honest conversation with your partner about your feelings?"),
-    ("We've talked, but things are still strained. I'm not sure if we can work things out.", "I understand that relationships can be complex. It may be helpful to seek advice from a professional therapist to navigate this situation."),
-    ("I've been thinking about that as well, but I'm unsure where to start.", "Taking that step is a big decision. I can help you find resources or therapists in your area. It's important to prioritize your well-being."),
-    ("Thank you for your support; I appreciate it. It's just been tough to find balance in life.", "I'm here to assist you in finding that balance. Remember, self-care is crucial during challenging times. What are some activities that bring you joy and relaxation?"),
-    ("I used to enjoy hiking, reading, and painting. Maybe I should revisit those hobbies.", "Reconnecting with your hobbies is a great idea. They can provide a sense of fulfillment. Let's make a plan to integrate those activities back into your life."),
-    ("That sounds like a plan. It's reassuring to have someone to talk to about this.", "I'm here to support you every step of the way. It's essential to have a support system when facing life's challenges."),
-
-    ("Hello, I'm facing a major decision, and I'm feeling torn about it.", "I'm here to help you navigate through your decision. Can you tell me more about the choice you're facing and what's causing your uncertainty?"),
-    ("I have a job opportunity in another city, which could be great for my career, but it would mean leaving behind family and friends.", "That's a tough decision. It's important to weigh the pros and cons. Have you made a list of the benefits and drawbacks of each option?"),
-    ("I have, but it's still difficult to decide. I'm afraid of losing the support system I have here.", "Leaving behind a support system can be challenging. It might help to have an open conversation with your loved ones about your decision and explore ways to stay connected."),
-    ("You're right; communication is key. I appreciate your advice.", "You're welcome. Remember that the decision you make should align with your long-term goals and happiness. I'm here to help you work through your thoughts and feelings."),
-
-    ("Hi, I've been struggling with my self-esteem, and it's affecting my confidence.", "I'm here to listen and provide guidance. Can you share what's been impacting your self-esteem and confidence?"),
-    ("I've been comparing myself to others a lot, especially on social media. It makes me feel inadequate.", "Social media can indeed influence self-esteem negatively. It's important to remember that people often post curated versions of their lives. Have you considered taking breaks from social media?"),
-    ("I have, but it's hard to stay away for long. I feel like I'm missing out on things.", "It's a common feeling. It might help to limit your time on social media and focus on self-improvement. What are some goals or activities that you're passionate about?"),
-    ("I used to enjoy playing the guitar, but I haven't picked it up in a while.", "Reconnecting with your passion for the guitar is a positive step. It can boost your self-esteem and provide a sense of accomplishment. Let's work on integrating it into your routine."),
-    ("Thank you for your encouragement. It means a lot to me.", "You're welcome. I'm here to support you in building your confidence and self-esteem. Remember, you are unique and have your own strengths and talents."),
-
-    ("Hey, I wanted to share some exciting news! I got a promotion at work today.", "That's fantastic news! Congratulations on your well-deserved promotion. Can you tell me more about your new role?"),
-    ("Thank you! I'll be leading a new team and taking on more responsibilities. I'm thrilled about the opportunity.", "It sounds like a great career move. Your hard work has paid off. How do you feel about this positive change in your life?"),
-    ("I feel both excited and a bit nervous about the added responsibilities, but I'm ready to embrace the challenge.", "Feeling a mix of excitement and nervousness is completely normal. You've shown your capabilities, and I'm confident you'll do an excellent job in your new role."),
-    ("Hello, I have some wonderful news to share! My partner and I are expecting our first child.", "That's incredible news! Congratulations on this exciting journey into parenthood. How do you both feel about becoming parents?"),
-    ("We're overjoyed and can't wait to welcome our little one into the world. It's a dream come true.", "Becoming parents is a special and transformative experience. Cherish these moments and prepare for a beautiful adventure together. If you have any questions or concerns, feel free to reach out."),
-    ("Thank you! We're already planning and decorating the nursery. We couldn't be happier.", "It's lovely to see your joy and enthusiasm. Preparing for your baby's arrival is an exciting part of the journey. Enjoy every moment and savor this special time in your lives."),
-
-
-    ("I just got engaged, and I couldn't be happier!", "Congratulations! That's incredible news. How did the proposal happen?"),
-    ("I passed my exams with flying colors! Such a relief!", "Wow, that's fantastic! Your hard work paid off. How are you planning to celebrate?"),
-    ("I received an unexpected compliment today. It brightened my day.", "Compliments are wonderful, and they can really boost your mood. What was the compliment about?"),
-
-    ("I lost my beloved pet today, and I'm heartbroken.", "I'm so sorry for your loss. Losing a pet is like losing a family member. Would you like to share some cherished memories of your pet?"),
-    ("I didn't get the job I was hoping for, and I'm feeling disappointed.", "I understand your disappointment. Rejections can be tough. What do you think you can learn from this experience?"),
-    ("A close friend canceled our plans last minute, and it hurt my feelings.", "Last-minute cancellations can be upsetting. Have you communicated with your friend about how you felt?"),
-
-    ("I won a scholarship for my dream program! I can't contain my excitement.", "That's incredible news! Your dedication and hard work paid off. What's your dream program about?"),
-    ("I'm going on a spontaneous weekend getaway, and I'm thrilled!", "Spontaneous trips can be so exciting! Where are you heading for your weekend getaway?"),
-    ("I got a surprise gift from my partner, and it made my day.", "Surprise gifts are wonderful. What was the gift, and how did it make you feel?"),
-
-    ("I have a big presentation tomorrow, and I'm feeling anxious about it.", "It's common to feel anxious before a presentation. How can I support you in preparing for it?"),
-    ("I'm worried about an upcoming medical checkup and the results.", "Health-related anxiety is common. What's causing your concerns, and have you talked to a healthcare professional about it?"),
-    ("I'm feeling anxious about meeting new people at a social event tonight.", "Social anxiety can be challenging. What strategies do you use to cope with social situations?"),
-
-    ("I had an argument with my coworker, and it left me really angry.", "Conflicts at work can be frustrating. Have you considered discussing the issue with your coworker to find a resolution?"),
-    ("I'm furious about the constant noise from my neighbors.", "Loud neighbors can be annoying. Have you tried talking to them about the noise issue?"),
-    ("I'm angry at myself for making a mistake in a project at work.", "Self-anger is common when we make mistakes. It's an opportunity to learn and improve. How can I help you handle this situation?"),
-
-    ("I aced my job interview and got the position. I feel so confident!", "That's fantastic! Your preparation and skills paid off. How do you plan to excel in your new role?"),
-    ("I gave a successful public speech and felt confident throughout.", "Public speaking can be nerve-wracking, but you managed it confidently. What's your secret to feeling so sure of yourself?"),
-    ("I finally reached a personal fitness goal, and my confidence is soaring.", "Hitting fitness goals is a major confidence booster. What's your next fitness milestone?"),
-
-    ("I want to express my gratitude for all the support my friends have given me.", "Gratitude is a beautiful emotion. How have your friends been supportive, and how do you plan to show your appreciation?"),
-    ("I received a thoughtful handwritten letter from a colleague, and it made my day.", "Handwritten letters are a rare and heartwarming gesture. What did the letter say, and how did it make you feel?"),
-    ("I'm thankful for good health, a loving family, and the opportunities life has given me.", "Gratitude for what you have is essential. What are some practices you use to remind yourself of these blessings?"),
-
-    ("I'm afraid of flying, and I have a flight coming up next week.", "Fear of flying is common. Have you considered trying relaxation techniques or speaking to a professional for assistance?"),
-    ("I'm terrified of speaking in public, and I have a presentation next month.", "Public speaking fear is widespread. Have you practiced and tried visualization techniques to overcome your fear?"),
-    ("I'm scared about the uncertainty of the future and my career.", "Fear of the unknown can be unsettling. How can I assist you in navigating this fear and setting clearer goals for your career?"),
-
-    ("I have hope that my relationship will improve after a tough patch.", "Maintaining hope during relationship challenges is vital. What are some steps you're taking to work through the issues?"),
-    ("I'm hopeful about launching my own business and being my boss one day.", "Entrepreneurial hope is inspiring. What's your vision for your business, and what steps are you taking to achieve your goals?"),
-    ("I have hope for a better tomorrow, filled with love, happiness, and new opportunities.", "A positive outlook can make a significant difference. How do you plan to work toward creating a better tomorrow?")
+#which LLM answers: "palm", "http" (a streaming chat server, see iris_llm.py) or "local" (offline canned replies)
+llm_backend = "palm"
+llm_url = "http://127.0.0.1:8765" #for "http", e.g. the stand-in server: python iris_llm.py
+llm_timeout = 20.0 #seconds before giving up on a reply
 
+llm = None #made by the warm up, importing the palm client is slow
+
+
+def connect_llm():
+    global llm
+    llm = make_backend(llm_backend, url=llm_url, api_key=key, model=model_id, timeout=llm_timeout)
 
-]
 
-conversation = [] #create conversation history
-
-prompt = record_and_transcribe() #initial from from user to begin convo
-print("YOU: "+ prompt)
-app.send_message("YOU", prompt)
-print()
-conversation.append({'author': 'user', 'content': prompt})
-
-#main conversation loop
-while True:
-    response = palm.chat(
-        messages=conversation,
-        temperature=0.8, #random,creative for better conversations each time
-        context='''Have an empathetic conversation with me as my friend/therapist.
-                    Ask me deep introspective questions one by one to better understand my 
-                    problems and then help me with your advice. 
-                    Give short replies of about 50 words only., dont go above 50 words
-                    Ask me one question at a time and try to keep the conversation going. 
-                    Your name is iris.
-                    i might share some positive news too so be supportive'''
+#search index over the examples, the few most similar ones are sent with each message
+few_shot_examples = 3
+example_index = None #built by the warm up
+
+
+def build_example_index():
+    global example_index
+    example_index = ExampleIndex(examples)
+
+#conversation history, recent turns word for word and a summary of older ones so requests stay small
+context_budget = 1500 #tokens of recent messages sent verbatim
+summary_budget = 300 #tokens for the summary of older messages
+llm_summaries = False #True asks the LLM to summarize old turns in the background, otherwise a cheap extractive summary is used
+
+
+#background summary of turns that no longer fit in the context budget
+def summarize_with_llm(previous_summary, folded):
+    lines = "\n".join(f"{m['author']}: {m['content']}" for m in folded)
+    return llm.chat(
+        messages=[{'author': 'user', 'content': f"Summary so far:\n{previous_summary}\n\nNew messages:\n{lines}"}],
+        temperature=0.0,
+        context='''Update the summary of this conversation with the new messages.
+                    Keep names, feelings, problems and advice given. Under 120 words.'''
     )
 
-    # Get the iris's reply and append it to the conversation
-    ai_reply = response.messages[-1]['content']
-    conversation.append({'author': 'AI', 'content': ai_reply})
 
-    
+conversation = ConversationContext(budget=context_budget, summary_budget=summary_budget,
+                                   summarize=summarize_with_llm if llm_summaries else None)
+
+
+#LLM stage, streams iris's reply to what the user said
+#pieces are yielded as they arrive so speech can start on the first sentence
+def chat_reply(user_input):
+    warm_up.wait("llm", "examples") #normally long done by the time the user has said something
+    conversation.add('user', user_input)
+    ai_reply = ""
+    try:
+        for piece in llm.stream(
+            messages=conversation.messages(),
+            temperature=0.8, #random,creative for better conversations each time
+            context=conversation.context_prompt(iris_context_prompt),
+            examples=example_index.search(user_input, k=few_shot_examples)
+        ):
+            ai_reply += piece
+            yield piece
+    finally:
+        # append the iris's reply to the conversation, even the part said before being interrupted
+        if ai_reply:
+            conversation.add('AI', ai_reply)
+
+
+def show_user_text(user_input):
+    print("YOU: "+ user_input)
+    app.send_message("YOU", user_input)
+    print()
+
+
+def show_reply(ai_reply):
     print("IRIS:", ai_reply)
     app.send_message("IRIS", ai_reply,iris_color)
-    
-    text_to_audio(ai_reply)
-    print()
-    
-    #get unser responce to iris's message
-    user_input = record_and_transcribe()
-    print("YOU: "+ user_input)
-    app.send_message("You", user_input)
     print()
-    conversation.append({'author': 'user', 'content': user_input})
-    
-    # Check for the termination message with variations
-    #if user says goodbye, end conversation and program with goodbye message
-    if any(word.lower() in user_input.lower() for word in ["goodbye", "good bye", "bye", "bye bye"]):
-        print("IRIS: Goodbye dear friend")
-        app.send_message("IRIS", "Goodbye dear friend",iris_color)
-        app.send_message("*******", "      End of Conversation        :*******","RED")
-        text_to_audio("Goodbye dear friend")
-        break
 
 
+# Check for the termination message with variations
+#if user says goodbye, end conversation and program with goodbye message
+def is_goodbye(user_input):
+    return any(word.lower() in user_input.lower() for word in ["goodbye", "good bye", "bye", "bye bye"])
+
+
+def show_goodbye():
+    print("IRIS: Goodbye dear friend")
+    app.send_message("IRIS", "Goodbye dear friend",iris_color)
+    app.send_message("*******", "      End of Conversation        :*******","RED")
+
+
+#while iris talks the vad only reacts to louder speech, so iris does not interrupt herself
+def on_speaking(speaking):
+    if vad is not None:
+        vad.energy_db = barge_in_energy_db if speaking else vad_energy_db
+
+
+#per stage latency of every turn, written to latency_report as json when the conversation ends (None to skip)
+latency_report = "iris_latency.json"
+metrics = LatencyRecorder()
+
+
+#starts every slow startup task in the background, skip: task names to leave out (e.g. no microphone in a benchmark)
+def start_warm_up(skip=()):
+    global warm_up, speech
+    if speech is None: #a benchmark may have put in its own
+        speech = make_speech()
+    whisper_registry.configure(model_name=whisper_model_size, threads=whisper_threads)
+    tasks = {
+        "whisper": lambda: whisper_registry.warm_up(background=False), #load the model and run one tiny decode
+        "microphone": capture_engine.open,
+        "mixer": speech.init_mixer,
+        "prerender": lambda: speech.prerender(fixed_phrases, background=False), #phrases IRIS says again and again
+        "llm": connect_llm,
+        "examples": build_example_index,
+    }
+    if not hands_free:
+        tasks["keyboard"] = lambda: __import__("pynput.keyboard")
+    warm_up = WarmUp(parallel=parallel_startup, started=launched)
+    for name, task in tasks.items():
+        if name not in skip:
+            warm_up.add(name, task)
+    return warm_up.start()
+
+
+def wait_until_interactive():
+    #block until the user can start talking
+    warm_up.wait(*(task for task in interactive_tasks if task in warm_up.tasks))
+
+
+#The main function, shows the GUI, warms up in the background and runs the conversation with IRIS
+def main():
+    shown = threading.Event()
+    gui_thread = threading.Thread(target=run_gui, args=(shown,)) #need threading else code wont progress till tk window close, making it useless
+    gui_thread.start()
+    #A separate thread is created to run the Tkinter GUI concurrently with the main program.
+    # This ensures that the program can continue execution while the GUI remains responsive.
+
+    start_warm_up()
+
+    shown.wait()
+    gui_seconds = time.perf_counter() - launched
+    wait_until_interactive()
+    interactive_seconds = time.perf_counter() - launched
+    metrics.add("startup_gui", gui_seconds)
+    metrics.add("time_to_interactive", interactive_seconds)
+    print(f"GUI shown after {gui_seconds:.2f} s, ready to listen after {interactive_seconds:.2f} s")
+    app.send_message("IRIS", "Hi, I am Iris, your virtual friend, feel free to talk to me Press ENTER to Start,Stop Speaking",iris_color)
+
+    #main conversation loop
+    #capture, transcription, reply, speech synthesis and playback run as overlapping stages
+    orchestrator = ConversationOrchestrator(capture=capture_utterance, transcribe=finish_transcription, chat=chat_reply,
+                                            speech=speech, on_user_text=show_user_text, on_reply=show_reply,
+                                            is_goodbye=is_goodbye, on_goodbye=show_goodbye, farewell="Goodbye dear friend",
+                                            on_speaking=on_speaking, barge_in=barge_in, metrics=metrics,
+                                            cancel_capture=stop_capture)
+    try:
+        asyncio.run(orchestrator.run())
+    finally:
+        #where the time went, per stage p50/p95/p99 and how long startup took
+        metrics.print_report()
+        print()
+        warm_up.print_report()
+        if latency_report:
+            metrics.export(latency_report)
+
+
+if __name__ == "__main__":
+    main()
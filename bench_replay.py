@@ -0,0 +1,158 @@
+"""
+IRIS - Replay benchmark
+
+Replays a folder of recorded utterances (.wav) through the full IRIS
+pipeline: transcription, LLM, TTS rendering and playback, run by the same
+ConversationOrchestrator the app uses. The LLM and TTS are stand-ins with
+fixed simulated latencies, so end to end turn latency can be compared
+between commits on a CPU only box without a microphone, speakers or
+network. Each utterance is "spoken" once IRIS has finished the previous reply.
+
+usage: python bench_replay.py fixtures/ [--model tiny.en] [--out latency.json]
+
+With --stt fixture whisper is skipped and the transcript is read from a
+.txt file next to each .wav (or the file name), to time everything else.
+"""
+
+import argparse #command line options
+import asyncio #the orchestrator
+import glob #finding fixtures
+import os #paths
+import threading #turn completion signal
+import time #simulated latencies
+import numpy as np
+
+from iris_audio import WHISPER_RATE, read_wav, resample
+from iris_llm import LocalBackend
+from iris_metrics import LatencyRecorder
+from iris_orchestrator import ConversationOrchestrator
+from iris_stt import WhisperRegistry
+from iris_tts import MIXER_RATE, SpeechPipeline
+
+
+class SimulatedSpeech(SpeechPipeline):
+    """
+    The SimulatedSpeech class is a SpeechPipeline with a fake synthesizer
+    (a tone, after a delay proportional to the text) and a fake speaker
+    (sleeps for the audio length times playback_scale). Time stretching
+    is still done for real.
+    """
+    def __init__(self, synth_ms_per_char=2.0, playback_scale=0.1, speed=1.25):
+        super().__init__(synthesize=self._synthesize, speed=speed)
+        self.synth_ms_per_char = synth_ms_per_char
+        self.playback_scale = playback_scale
+        self._playing_until = 0.0
+        self._play_lock = threading.Lock()
+
+    def _synthesize(self, text, voice):
+        time.sleep(len(text) * self.synth_ms_per_char / 1000)
+        seconds = 0.06 * len(text) #about how long gTTS takes to say it
+        t = np.arange(int(seconds * MIXER_RATE)) / MIXER_RATE
+        return (3000 * np.sin(2 * np.pi * 180 * t)).astype(np.int16), MIXER_RATE
+
+    def init_mixer(self):
+        return None
+
+    @property
+    def busy(self):
+        return time.perf_counter() < self._playing_until
+
+    def enqueue(self, pcm, cancel=None):
+        with self._play_lock:
+            start = max(time.perf_counter(), self._playing_until)
+            self._playing_until = start + len(pcm) / MIXER_RATE * self.playback_scale
+
+    def wait_done(self, cancel=None):
+        cancel = cancel or self._stop
+        while self.busy and not cancel.is_set():
+            time.sleep(0.005)
+
+    def stop(self):
+        self._stop.set()
+        self._playing_until = 0.0
+
+    def speak(self, text, speed=None):
+        self._stop.clear()
+        self.enqueue(self.render(text, speed))
+        self.wait_done()
+
+
+def load_fixtures(folder):
+    #[(name, 16 kHz float32 audio, reference text or None)]
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(folder, "*.wav"))):
+        samples, rate = read_wav(path)
+        audio = resample(samples.astype(np.float32) / 32768.0, rate, WHISPER_RATE)
+        text_path = os.path.splitext(path)[0] + ".txt"
+        text = open(text_path).read().strip() if os.path.exists(text_path) else None
+        fixtures.append((os.path.basename(path), audio, text))
+    return fixtures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="replay recorded utterances through the IRIS pipeline")
+    parser.add_argument("fixtures", help="folder with .wav files (16 bit), optional .txt transcripts next to them")
+    parser.add_argument("--stt", choices=["whisper", "fixture"], default="whisper")
+    parser.add_argument("--model", default="tiny.en", help="whisper model size")
+    parser.add_argument("--threads", type=int, default=None, help="torch threads for whisper")
+    parser.add_argument("--first-token-ms", type=float, default=300.0, help="simulated LLM time to first token")
+    parser.add_argument("--token-ms", type=float, default=15.0, help="simulated LLM time per token")
+    parser.add_argument("--synth-ms-per-char", type=float, default=2.0, help="simulated TTS synthesis time")
+    parser.add_argument("--playback-scale", type=float, default=0.1, help="fraction of real time spent 'playing'")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the folder this many times")
+    parser.add_argument("--out", default="bench_replay.json", help="where to write the latency report")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures) * args.repeat
+    if not fixtures:
+        parser.error(f"no .wav files in {args.fixtures}")
+
+    registry = None
+    if args.stt == "whisper":
+        registry = WhisperRegistry(model_name=args.model, threads=args.threads)
+        registry.warm_up(background=False) #load time is not part of a turn
+
+    turn_done = threading.Event()
+    metrics = LatencyRecorder(on_turn_complete=lambda turn, durations: turn_done.set())
+    remaining = iter(fixtures)
+    orchestrator = None
+
+    def capture(on_speech_start):
+        #the "user" speaks the next fixture once IRIS has finished answering the last one
+        if orchestrator.turn > 0 and not turn_done.wait(timeout=60):
+            print(f"turn {orchestrator.turn} did not finish within 60 s")
+        turn_done.clear()
+        fixture = next(remaining, None)
+        if fixture is None:
+            orchestrator.stop()
+            time.sleep(0.1)
+            return None
+        on_speech_start()
+        return fixture
+
+    def transcribe(fixture):
+        name, audio, text = fixture
+        if registry is None:
+            return text or os.path.splitext(name)[0].replace("_", " ")
+        return registry.transcribe(audio)
+
+    def show_user_text(text):
+        print("YOU:", text.strip())
+
+    llm = LocalBackend(args.first_token_ms / 1000, args.token_ms / 1000)
+    orchestrator = ConversationOrchestrator(
+        capture=capture, transcribe=transcribe,
+        chat=lambda text: llm.stream([{'author': 'user', 'content': text}]),
+        speech=SimulatedSpeech(args.synth_ms_per_char, args.playback_scale),
+        on_user_text=show_user_text, barge_in=False, metrics=metrics)
+
+    started = time.perf_counter()
+    asyncio.run(orchestrator.run())
+    print(f"\n{len(fixtures)} utterances in {time.perf_counter() - started:.1f} s\n")
+    metrics.print_report()
+    metrics.export(args.out)
+    print(f"\nreport written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
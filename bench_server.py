@@ -0,0 +1,163 @@
+"""
+IRIS - Server load generator
+
+Simulates N clients talking to an IRIS server at the same time and
+measures how per-session latency and aggregate throughput scale with N.
+Every client opens a session, sends an utterance, waits for the whole
+reply, thinks for a moment and sends the next one. A "busy" answer makes
+it wait retry_after seconds and send the same utterance again.
+
+usage:
+    python bench_server.py --clients 1,4,16,32 --stt simulated       (starts its own server in process)
+    python bench_server.py --clients 8 --connect 127.0.0.1:8770      (load an already running iris_server.py)
+
+Utterances are the .wav files in --fixtures, or --seconds of synthetic
+audio per utterance if no folder is given.
+"""
+
+import argparse #command line options
+import asyncio #one task per client
+import base64 #audio inside json
+import glob #finding fixtures
+import json #the protocol and the report
+import os #paths
+import random #think time
+import time #latencies
+import numpy as np
+
+from iris_audio import WHISPER_RATE, read_wav, resample
+from iris_llm import LocalBackend
+from iris_metrics import summarize
+from iris_server import MAX_MESSAGE_BYTES, add_server_arguments, make_server
+
+
+def load_utterances(folder, seconds):
+    #base64 16 kHz PCM payloads, the fixtures or one synthetic "voice" clip per variant
+    clips = []
+    if folder:
+        for path in sorted(glob.glob(os.path.join(folder, "*.wav"))):
+            samples, rate = read_wav(path)
+            clips.append(resample(samples.astype(np.float32) / 32768.0, rate, WHISPER_RATE))
+    else:
+        t = np.arange(int(seconds * WHISPER_RATE)) / WHISPER_RATE
+        for pitch in (140, 180, 220, 260, 300):
+            clips.append(0.2 * np.sin(2 * np.pi * pitch * t) * (0.5 + 0.5 * np.sin(2 * np.pi * 3 * t)))
+    return [base64.b64encode((np.clip(clip, -1, 1) * 32767).astype(np.int16).tobytes()).decode("ascii")
+            for clip in clips]
+
+
+async def client(host, port, utterances, turns, think, results):
+    #one simulated user
+    reader, writer = await asyncio.open_connection(host, port, limit=MAX_MESSAGE_BYTES)
+
+    async def receive():
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("server closed the connection")
+        return json.loads(line)
+
+    ready = await receive()
+    if ready["type"] != "ready":
+        results["refused"] += 1
+        writer.close()
+        return
+    for i in range(turns):
+        payload = json.dumps({"type": "audio", "pcm": utterances[(ready["session"] + i) % len(utterances)],
+                              "rate": WHISPER_RATE}).encode("ascii") + b"\n"
+        while True:
+            sent = time.perf_counter()
+            writer.write(payload)
+            await writer.drain()
+            message = await receive()
+            if message["type"] == "busy":
+                results["busy"] += 1
+                await asyncio.sleep(message["retry_after"])
+                continue
+            break
+        first_piece = None
+        while message["type"] != "reply_done":
+            if message["type"] == "transcript":
+                results["transcript"].append(time.perf_counter() - sent)
+            elif message["type"] == "reply" and first_piece is None:
+                first_piece = time.perf_counter() - sent
+                results["first_reply"].append(first_piece)
+            elif message["type"] == "error":
+                results["errors"] += 1
+                break
+            message = await receive()
+        else:
+            results["reply_done"].append(time.perf_counter() - sent)
+        await asyncio.sleep(random.uniform(0, 2 * think))
+    writer.write(b'{"type": "bye"}\n')
+    await writer.drain()
+    writer.close()
+
+
+async def run_level(args, clients, utterances):
+    #one load level, returns its report
+    server = None
+    host, port = args.host, args.port
+    if not args.connect:
+        llm = LocalBackend(args.first_token_ms / 1000, args.token_ms / 1000)
+        server = await make_server(args, llm, "127.0.0.1", 0).start()
+        host, port = "127.0.0.1", server.port
+    results = {"transcript": [], "first_reply": [], "reply_done": [], "busy": 0, "errors": 0, "refused": 0}
+    started = time.perf_counter()
+    await asyncio.gather(*(client(host, port, utterances, args.turns, args.think_ms / 1000, results)
+                           for _ in range(clients)))
+    seconds = time.perf_counter() - started
+    report = {
+        "clients": clients,
+        "seconds": round(seconds, 2),
+        "utterances_per_second": round(len(results["reply_done"]) / seconds, 2),
+        "busy": results["busy"],
+        "errors": results["errors"],
+        "refused": results["refused"],
+        **{stage: summarize(results[stage]) for stage in ("transcript", "first_reply", "reply_done")},
+    }
+    if server is not None:
+        server.scheduler.stop()
+        report["scheduler"] = server.scheduler.report()
+        await server.close()
+    return report
+
+
+async def run(args):
+    utterances = load_utterances(args.fixtures, args.seconds)
+    if not utterances:
+        raise SystemExit(f"no .wav files in {args.fixtures}")
+    levels = []
+    print(f"{'clients':>7}{'utt/s':>8}{'transcript p50/p95 ms':>24}{'reply done p50/p95 ms':>24}{'batch':>7}{'busy':>6}")
+    for clients in (int(n) for n in args.clients.split(",")):
+        report = await run_level(args, clients, utterances)
+        levels.append(report)
+        batch = report.get("scheduler", {}).get("mean_batch_size", float("nan"))
+        transcript, done = report["transcript"], report["reply_done"]
+        print(f"{clients:>7}{report['utterances_per_second']:>8.1f}"
+              f"{transcript.get('p50_ms', 0):>12.0f}{transcript.get('p95_ms', 0):>12.0f}"
+              f"{done.get('p50_ms', 0):>12.0f}{done.get('p95_ms', 0):>12.0f}{batch:>7.2f}{report['busy']:>6}")
+    with open(args.out, "w") as f:
+        json.dump(levels, f, indent=2)
+    print(f"\nreport written to {args.out}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="simulate many clients talking to an IRIS server")
+    parser.add_argument("--clients", default="1,4,16", help="comma separated numbers of concurrent clients")
+    parser.add_argument("--turns", type=int, default=5, help="utterances per client")
+    parser.add_argument("--think-ms", type=float, default=500.0, help="mean pause between a reply and the next utterance")
+    parser.add_argument("--fixtures", default=None, help="folder of .wav utterances")
+    parser.add_argument("--seconds", type=float, default=3.0, help="length of synthetic utterances")
+    parser.add_argument("--connect", default=None, help="host:port of a running server, otherwise one is started here")
+    parser.add_argument("--first-token-ms", type=float, default=300.0, help="simulated LLM time to first token")
+    parser.add_argument("--token-ms", type=float, default=15.0, help="simulated LLM time per token")
+    parser.add_argument("--out", default="bench_server.json", help="where to write the report")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+    host, port = args.connect.rsplit(":", 1) if args.connect else ("127.0.0.1", 0)
+    args.host, args.port = host, int(port)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+IRIS - Startup benchmark
+
+Measures how long IRIS takes from launch until the user can start
+talking (time to interactive) and until every background task is done.
+Each run is a fresh python process that imports the app and runs its real
+startup tasks, once with the tasks in parallel and once one after another,
+so the effect of lazy imports and parallel warm-up shows up directly.
+
+usage: python bench_startup.py [--runs 5] [--model tiny.en] [--mic] [--mixer] [--out startup.json]
+
+Without --mic and --mixer the audio devices are left out, so it also runs
+on a headless box. Speech synthesis is simulated unless --gtts is given,
+and the LLM is the local stand-in unless --llm says otherwise. Times are
+measured from the start of the app's imports, interpreter startup is not
+included.
+"""
+
+import time #must come first, imports are part of what is measured
+started = time.perf_counter()
+
+import argparse #command line options
+import json #child -> parent results
+import subprocess #fresh process per run
+import sys #python executable
+
+
+def child(args):
+    #one cold start, prints its timings as json on the last line
+    import IRIS_final as iris
+    imports = time.perf_counter() - started
+    iris.launched = started
+    iris.parallel_startup = not args.sequential
+    iris.llm_backend = args.llm
+    iris.whisper_model_size = args.model
+    if not args.gtts:
+        from iris_tts import MIXER_RATE, SpeechCache, SpeechPipeline
+        import numpy as np
+
+        def simulated(text, voice):
+            time.sleep(len(text) * args.synth_ms_per_char / 1000)
+            return np.zeros(int(0.06 * len(text) * MIXER_RATE), dtype=np.int16), MIXER_RATE
+
+        iris.speech = SpeechPipeline(synthesize=simulated, speed=iris.tts_speed, cache=SpeechCache())
+    skip = [name for name, wanted in (("microphone", args.mic), ("mixer", args.mixer)) if not wanted]
+    warm_up = iris.start_warm_up(skip=skip)
+    iris.wait_until_interactive()
+    interactive = time.perf_counter() - started
+    warm_up.wait()
+    all_ready = time.perf_counter() - started
+    print(json.dumps({"imports": imports, "time_to_interactive": interactive, "all_ready": all_ready,
+                      "tasks": warm_up.report()}))
+    iris.capture_engine.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="measure IRIS time to interactive")
+    parser.add_argument("--runs", type=int, default=5, help="cold starts per mode")
+    parser.add_argument("--model", default="tiny.en", help="whisper model size")
+    parser.add_argument("--llm", choices=["palm", "http", "local"], default="local")
+    parser.add_argument("--mic", action="store_true", help="open the microphone too")
+    parser.add_argument("--mixer", action="store_true", help="start the pygame mixer too")
+    parser.add_argument("--gtts", action="store_true", help="pre-render with gTTS instead of simulated synthesis")
+    parser.add_argument("--synth-ms-per-char", type=float, default=2.0, help="simulated TTS synthesis time")
+    parser.add_argument("--out", default="bench_startup.json", help="where to write the report")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--sequential", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args)
+        return
+
+    from iris_metrics import summarize #after the child check, so children don't pay for it
+
+    options = [arg for arg in sys.argv[1:] if arg not in ("--child", "--sequential")]
+    report = {}
+    for mode in ("parallel", "sequential"):
+        runs = []
+        for i in range(args.runs):
+            command = [sys.executable, __file__, "--child", *options] + (["--sequential"] if mode == "sequential" else [])
+            result = subprocess.run(command, capture_output=True, text=True)
+            lines = result.stdout.strip().splitlines()
+            if result.returncode != 0 or not lines:
+                print(result.stdout, result.stderr)
+                parser.error(f"{mode} run {i + 1} failed")
+            runs.append(json.loads(lines[-1]))
+        report[mode] = {metric: summarize([run[metric] for run in runs])
+                        for metric in ("imports", "time_to_interactive", "all_ready")}
+        report[mode]["tasks"] = {name: summarize([run["tasks"][name]["seconds"] for run in runs])
+                                 for name in runs[0]["tasks"]}
+        report[mode]["task_errors"] = {name: task["error"] for run in runs for name, task in run["tasks"].items() if task["error"]}
+
+    print(f"{'':<22}{'parallel p50 ms':>17}{'sequential p50 ms':>19}")
+    for metric in ["imports", "time_to_interactive", "all_ready"] + [f"task {name}" for name in report["parallel"]["tasks"]]:
+        if metric.startswith("task "):
+            row = [report[mode]["tasks"][metric[5:]]["p50_ms"] for mode in ("parallel", "sequential")]
+        else:
+            row = [report[mode][metric]["p50_ms"] for mode in ("parallel", "sequential")]
+        print(f"{metric:<22}{row[0]:>17.1f}{row[1]:>19.1f}")
+    for name, error in report["parallel"]["task_errors"].items():
+        print(f"\n{name} failed: {error}")
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nreport written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+IRIS - Time stretch benchmark
+
+Compares the NumPy WSOLA time stretch with the old pydub speedup on the
+same clips and prints how many times faster than real time each one is.
+
+usage: python bench_time_stretch.py [clip.wav ...] [--speed 1.25] [--repeat 3]
+Without clips a few synthetic voice like clips of different lengths are used.
+"""
+
+import argparse #command line options
+import importlib.util #is pydub installed
+import time #timing
+import numpy as np
+
+from iris_audio import read_wav
+from iris_stretch import time_stretch
+
+
+def synthetic_voice(seconds, rate=24000, seed=0):
+    #harmonics of a wandering pitch with a syllable like envelope, close enough to speech for timing
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * rate)) / rate
+    f0 = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / rate
+    voice = sum(np.sin(h * phase) / h for h in range(1, 12))
+    envelope = np.clip(np.sin(2 * np.pi * 3 * t), 0, None)
+    audio = voice * envelope + 0.01 * rng.standard_normal(len(t))
+    return (audio / np.abs(audio).max() * 12000).astype(np.int16), rate
+
+
+def pydub_speedup(samples, rate, speed):
+    #what IRIS used before: pydub chunk and crossfade speedup
+    from pydub import AudioSegment
+    segment = AudioSegment(samples.tobytes(), frame_rate=rate, sample_width=2, channels=1)
+    segment = segment.speedup(playback_speed=speed)
+    return np.array(segment.get_array_of_samples(), dtype=np.int16)
+
+
+def best_time(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark IRIS time stretching")
+    parser.add_argument("clips", nargs="*", help=".wav files to stretch")
+    parser.add_argument("--speed", type=float, default=1.25)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.clips:
+        clips = [(path, *read_wav(path)) for path in args.clips]
+    else:
+        clips = [(f"synthetic {s}s", *synthetic_voice(s, seed=s)) for s in (2, 10, 30)]
+
+    have_pydub = importlib.util.find_spec("pydub") is not None
+    if not have_pydub:
+        print("pydub is not installed, only timing WSOLA")
+
+    print(f"{'clip':<24}{'length':>8}{'wsola':>10}{'x rt':>8}{'pydub':>10}{'x rt':>8}{'speedup':>9}")
+    for name, samples, rate in clips:
+        length = len(samples) / rate
+        wsola = best_time(lambda: time_stretch(samples, rate, args.speed), args.repeat)
+        line = f"{name:<24}{length:>7.1f}s{wsola * 1000:>8.1f}ms{length / wsola:>8.0f}"
+        if have_pydub:
+            old = best_time(lambda: pydub_speedup(samples, rate, args.speed), args.repeat)
+            line += f"{old * 1000:>8.1f}ms{length / old:>8.0f}{old / wsola:>8.1f}x"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
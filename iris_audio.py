@@ -0,0 +1,286 @@
+"""
+IRIS - Audio helpers
+
+Small NumPy helpers to turn the raw int16 frames captured by PyAudio
+into the 16 kHz float32 array Whisper expects, entirely in memory.
+No temporary file and no ffmpeg process are needed.
+"""
+
+import queue #capture callback -> recording thread
+import threading #guarding the device handle
+import wave #optional debug copy of what was recorded
+import numpy as np #vectorised audio maths
+
+
+WHISPER_RATE = 16000 #whisper models are trained on 16 kHz mono audio
+
+
+def pcm16_to_float(data):
+    #data: bytes, int16 array, or a list of either, of mono samples
+    #returns float32 samples between -1 and 1
+    if isinstance(data, (list, tuple)):
+        if data and isinstance(data[0], np.ndarray):
+            data = data[0] if len(data) == 1 else np.concatenate(data)
+        else:
+            data = b"".join(data)
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = np.frombuffer(data, dtype=np.int16)
+    return data.astype(np.float32) / 32768.0
+
+
+def _lowpass_kernel(cutoff, taps=63):
+    #windowed sinc low pass filter, cutoff is a fraction of the input sample rate (0 - 0.5)
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+def resample(audio, src_rate, dst_rate=WHISPER_RATE):
+    #resample a float32 mono signal from src_rate to dst_rate
+    #downsampling is low pass filtered first so no aliasing leaks into the speech band
+    if src_rate == dst_rate or len(audio) == 0:
+        return audio.astype(np.float32, copy=False)
+    if dst_rate < src_rate:
+        audio = np.convolve(audio, _lowpass_kernel(0.5 * dst_rate / src_rate * 0.95), mode="same")
+    if src_rate % dst_rate == 0:
+        #integer ratio like 48000 -> 16000, just keep every nth sample
+        return np.ascontiguousarray(audio[::src_rate // dst_rate], dtype=np.float32)
+    #any other ratio, linear interpolation on the new time grid
+    n_out = int(round(len(audio) * dst_rate / src_rate))
+    positions = np.arange(n_out) * (src_rate / dst_rate)
+    return np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+
+
+def frames_to_whisper(frames, src_rate):
+    #captured int16 frames -> 16 kHz float32 array ready for whisper
+    return resample(pcm16_to_float(frames), src_rate, WHISPER_RATE)
+
+
+def read_wav(path):
+    #mono int16 samples and sample rate of a 16 bit .wav file, stereo is mixed down
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16 bit .wav files are supported")
+        rate = f.getframerate()
+        samples = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+        if f.getnchannels() > 1:
+            samples = samples.reshape(-1, f.getnchannels()).mean(axis=1).astype(np.int16)
+    return samples, rate
+
+
+def write_wav(path, frames, rate, channels=1):
+    #debug sink, saves the raw int16 frames as a .wav file
+    if isinstance(frames, (list, tuple)):
+        frames = b"".join(f.astype(np.int16).tobytes() if isinstance(f, np.ndarray) else f for f in frames)
+    elif isinstance(frames, np.ndarray):
+        frames = frames.astype(np.int16).tobytes()
+    sound_file = wave.open(path, "wb")
+    sound_file.setnchannels(channels) #monaural(single channel) and not stereo(2 channel)
+    sound_file.setsampwidth(2) #16 bit samples
+    sound_file.setframerate(rate)
+    sound_file.writeframes(frames)
+    sound_file.close()
+
+
+class EnergyVAD:
+    """
+    The EnergyVAD class is a small voice activity detector based on frame
+    energy and zero crossing rate. Frames louder than the threshold (and the
+    running noise floor) with a speech like crossing rate count as speech,
+    and speech is held for a short hangover so pauses between words do not
+    cut the utterance.
+    """
+    def __init__(self, rate, frame_ms=20, energy_db=-45.0, noise_margin_db=10.0, zcr_max=0.35, hangover_ms=300):
+        #rate: sample rate of the audio fed to process()
+        #energy_db: minimum frame level in dBFS to count as speech
+        #noise_margin_db: a frame must also be this much louder than the running noise floor
+        #zcr_max: frames crossing zero more often than this (fraction of samples) are hiss, not voice
+        #hangover_ms: how long to keep saying "speech" after the last speech frame
+        self.rate = rate
+        self.frame_len = int(rate * frame_ms / 1000)
+        self.energy_db = energy_db
+        self.noise_margin_db = noise_margin_db
+        self.zcr_max = zcr_max
+        self.hangover_frames = int(round(hangover_ms / frame_ms))
+        self.reset()
+
+    def reset(self):
+        #forget everything, call before a new utterance
+        self.noise_db = self.energy_db - self.noise_margin_db #running noise floor estimate
+        self.speech_seen = False #has any speech been detected yet
+        self.silence = 0.0 #seconds since the last speech frame
+        self._hang = 0
+        self._carry = np.zeros(0, dtype=np.float32) #samples that did not fill a whole frame yet
+
+    def frame_flags(self, audio):
+        #audio: float32 samples, returns one bool per whole frame, True where it looks like speech
+        #does not use hangover and does not change the state apart from the noise floor
+        n = len(audio) // self.frame_len
+        if n == 0:
+            return np.zeros(0, dtype=bool)
+        frames = audio[:n * self.frame_len].reshape(n, self.frame_len)
+        level = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+        zcr = np.mean(np.signbit(frames[:, 1:]) != np.signbit(frames[:, :-1]), axis=1)
+        speech = (level > self.energy_db) & (level > self.noise_db + self.noise_margin_db) & (zcr < self.zcr_max)
+        quiet = level[level < self.energy_db]
+        if len(quiet):
+            #follow the background level slowly, only from frames too quiet to be speech at all,
+            #so a user who is already talking when recording starts can't drag the floor up to their voice
+            self.noise_db = 0.9 * self.noise_db + 0.1 * float(np.mean(quiet))
+        return speech
+
+    def process(self, chunk):
+        #chunk: float32 samples straight from the capture loop
+        #returns True if the chunk is speech (or inside the hangover after speech)
+        audio = np.concatenate((self._carry, chunk)) if len(self._carry) else chunk
+        flags = self.frame_flags(audio)
+        self._carry = audio[len(flags) * self.frame_len:].copy()
+        active = False
+        for flag in flags:
+            if flag:
+                self.speech_seen = True
+                self.silence = 0.0
+                self._hang = self.hangover_frames
+                active = True
+            else:
+                self.silence += self.frame_len / self.rate
+                if self._hang > 0:
+                    self._hang -= 1
+                    active = True
+        return active
+
+
+def trim_silence(audio, rate, vad=None, pad_ms=200):
+    #cut leading and trailing silence from a whole recording
+    #pad_ms of audio is kept on both sides so word onsets are not clipped
+    vad = vad or EnergyVAD(rate)
+    flags = vad.frame_flags(audio)
+    speech = np.flatnonzero(flags)
+    if len(speech) == 0:
+        return audio[:0]
+    pad = int(rate * pad_ms / 1000)
+    start = max(0, speech[0] * vad.frame_len - pad)
+    end = min(len(audio), (speech[-1] + 1) * vad.frame_len + pad)
+    return audio[start:end]
+
+
+class RingBuffer:
+    """
+    The RingBuffer class is a preallocated int16 sample buffer. Positions
+    are absolute sample counts since the last reset; when the buffer wraps
+    the oldest samples are overwritten, so it never grows.
+    """
+    def __init__(self, capacity):
+        #capacity: number of samples the buffer holds
+        self.capacity = capacity
+        self.data = np.zeros(capacity, dtype=np.int16)
+        self.written = 0 #absolute position of the next sample
+
+    def reset(self):
+        self.written = 0
+
+    def write(self, samples):
+        #append samples, returns the (start, end) positions they were written to
+        start = self.written
+        n = len(samples)
+        if n > self.capacity: #only the newest samples fit
+            samples = samples[-self.capacity:]
+            start += n - self.capacity
+            n = self.capacity
+        offset = start % self.capacity
+        first = min(n, self.capacity - offset)
+        self.data[offset:offset + first] = samples[:first]
+        self.data[:n - first] = samples[first:]
+        self.written = start + n
+        return start, self.written
+
+    def view(self, start, end):
+        #samples between two positions, a zero copy view unless the range wraps around the end
+        if end - start > self.capacity or start < self.written - self.capacity:
+            raise ValueError("samples already overwritten")
+        offset = start % self.capacity
+        if offset + (end - start) <= self.capacity:
+            return self.data[offset:offset + (end - start)]
+        return np.concatenate((self.data[offset:], self.data[:end % self.capacity]))
+
+
+class CaptureEngine:
+    """
+    The CaptureEngine class keeps one PyAudio instance and one input
+    stream open for the whole session. PyAudio's callback writes every
+    chunk into a preallocated RingBuffer and only passes the positions on,
+    the recording thread then reads zero copy views of the buffer.
+    Each capture starts at the beginning of the buffer, so one capture can
+    be at most max_seconds long and memory stays fixed.
+    """
+    def __init__(self, rate=48000, chunk=1024, max_seconds=60, device_index=None):
+        #rate: sample rate, chunk: samples per callback
+        #max_seconds: longest single capture, the buffer is allocated for this once
+        #device_index: PyAudio input device, None is the system default
+        self.rate = rate
+        self.chunk = chunk
+        self.device_index = device_index
+        self.ring = RingBuffer(int(rate * max_seconds))
+        self.chunks = queue.SimpleQueue() #(start, end) positions of new audio
+        self.capturing = False
+        self.full = False #set when a capture reached max_seconds
+        self._audio = None
+        self._stream = None
+        self._lock = threading.Lock()
+
+    def open(self):
+        #open the device once, later calls do nothing
+        with self._lock:
+            if self._stream is None:
+                import pyaudio #audio input output
+                self._audio = pyaudio.PyAudio()
+                self._continue = pyaudio.paContinue
+                self._stream = self._audio.open(format=pyaudio.paInt16, #each audio sample is a 16-bit integer
+                                                channels=1,
+                                                rate=self.rate,
+                                                input=True,
+                                                input_device_index=self.device_index,
+                                                frames_per_buffer=self.chunk,
+                                                stream_callback=self._callback)
+        return self
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        #runs on PyAudio's thread, keep it short: copy into the ring and pass the positions on
+        if self.capturing and not self.full:
+            samples = np.frombuffer(in_data, dtype=np.int16)
+            room = self.ring.capacity - self.ring.written
+            if len(samples) >= room:
+                samples = samples[:room]
+                self.full = True
+            self.chunks.put(self.ring.write(samples))
+        return (None, self._continue)
+
+    def start(self):
+        #begin a new capture at the start of the buffer
+        self.open()
+        while not self.chunks.empty(): #positions left over from the last capture
+            self.chunks.get_nowait()
+        self.ring.reset()
+        self.full = False
+        self.capturing = True
+        if not self._stream.is_active():
+            self._stream.start_stream()
+
+    def stop(self):
+        #end the capture, the device stays open for the next one
+        self.capturing = False
+
+    def read(self, timeout=0.1):
+        #next (start, end) positions of captured audio, or None if nothing came in time
+        try:
+            return self.chunks.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        with self._lock:
+            if self._stream is not None:
+                self._stream.stop_stream()
+                self._stream.close()
+                self._audio.terminate()
+                self._stream = None
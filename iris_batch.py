@@ -0,0 +1,164 @@
+"""
+IRIS - Batch mode
+
+Transcribes and answers a whole folder (or manifest) of recorded audio
+without a microphone, speakers or GUI. Files are spread over a pool of
+worker processes, each holding its own resident Whisper model, and every
+result is appended to a JSONL file as soon as it is ready. Running the
+same command again skips the files that already have a result, so a long
+run can be stopped and resumed at any time.
+
+usage:
+    python iris_batch.py recordings/ --out results.jsonl --workers 4 --llm local
+    python iris_batch.py manifest.txt ...    (one audio path per line)
+    python iris_batch.py manifest.jsonl ...  (one {"file": path} per line)
+"""
+
+import argparse #command line options
+import json #manifest and results
+import multiprocessing #worker processes
+import os #paths and cpu count
+import time #throughput
+import numpy as np
+
+from iris_audio import WHISPER_RATE, EnergyVAD, read_wav, resample, trim_silence
+
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a", ".flac", ".ogg", ".webm")
+
+#per worker process state, set up once by _init_worker
+_worker = {}
+
+
+def list_inputs(source):
+    #a folder of audio files or a manifest (.txt with one path per line, .jsonl with {"file": path})
+    if os.path.isdir(source):
+        return sorted(os.path.join(root, name)
+                      for root, _, names in os.walk(source)
+                      for name in names if name.lower().endswith(AUDIO_EXTENSIONS))
+    base = os.path.dirname(os.path.abspath(source))
+    paths = []
+    with open(source) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            path = json.loads(line)["file"] if line.startswith("{") else line
+            paths.append(path if os.path.isabs(path) else os.path.join(base, path))
+    return paths
+
+
+def completed(out_path):
+    #files that already have a good result in out_path, a half written last line is ignored
+    done = set()
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if "error" not in record:
+                done.add(record["file"])
+    return done
+
+
+def _init_worker(model, threads, llm_name, llm_url, api_key, trim):
+    #runs once in every worker process: load whisper and open the LLM connection there
+    from iris_examples import ExampleIndex
+    from iris_llm import make_backend
+    from iris_persona import examples
+    from iris_stt import WhisperRegistry
+    registry = WhisperRegistry(model_name=model, threads=threads)
+    registry.warm_up(background=False)
+    _worker.update(registry=registry, llm=make_backend(llm_name, url=llm_url, api_key=api_key),
+                   examples=ExampleIndex(examples), trim=trim)
+
+
+def _load_audio(path, trim):
+    #16 kHz float32 for whisper, .wav is decoded in memory, anything else goes through whisper's ffmpeg loader
+    if path.lower().endswith(".wav"):
+        samples, rate = read_wav(path)
+        audio = samples.astype(np.float32) / 32768.0
+        if trim:
+            audio = trim_silence(audio, rate, EnergyVAD(rate))
+        return resample(audio, rate, WHISPER_RATE)
+    import whisper
+    audio = whisper.load_audio(path)
+    return trim_silence(audio, WHISPER_RATE, EnergyVAD(WHISPER_RATE)) if trim else audio
+
+
+def process_file(path):
+    #worker: transcribe one file and get IRIS's reply, returns the JSONL record
+    from iris_persona import iris_context_prompt
+    record = {"file": path, "worker": os.getpid()}
+    try:
+        start = time.perf_counter()
+        audio = _load_audio(path, _worker["trim"])
+        record["audio_seconds"] = round(len(audio) / WHISPER_RATE, 2)
+        transcript = _worker["registry"].transcribe(audio).strip() if len(audio) else ""
+        record["transcript"] = transcript
+        record["transcribe_s"] = round(time.perf_counter() - start, 3)
+        if transcript:
+            start = time.perf_counter()
+            record["reply"] = _worker["llm"].chat(
+                [{'author': 'user', 'content': transcript}], context=iris_context_prompt,
+                examples=_worker["examples"].search(transcript, k=3))
+            record["reply_s"] = round(time.perf_counter() - start, 3)
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    return record
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="transcribe and answer a corpus of recordings with IRIS")
+    parser.add_argument("source", help="folder of audio files or a manifest (.txt / .jsonl)")
+    parser.add_argument("--out", default="iris_batch.jsonl", help="results, one JSON object per line, appended")
+    parser.add_argument("--workers", type=int, default=cpus, help="worker processes, each with its own model")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="torch threads per worker (default: cpu count / workers)")
+    parser.add_argument("--model", default="base.en", help="whisper model size")
+    parser.add_argument("--llm", choices=["palm", "http", "local"], default="local")
+    parser.add_argument("--llm-url", default="http://127.0.0.1:8765")
+    parser.add_argument("--api-key", default=os.environ.get("IRIS_PALM_KEY"))
+    parser.add_argument("--no-trim", action="store_true", help="don't cut leading and trailing silence")
+    args = parser.parse_args()
+
+    files = list_inputs(args.source)
+    done = completed(args.out)
+    todo = [path for path in files if path not in done]
+    print(f"{len(files)} files, {len(files) - len(todo)} already done, {len(todo)} to go")
+    if not todo:
+        return
+
+    workers = max(1, min(args.workers, len(todo)))
+    threads = args.threads or max(1, cpus // workers) #so the workers don't fight over cores
+    #spawn, not fork: every worker starts clean and loads its own torch and model
+    context = multiprocessing.get_context("spawn")
+    start = time.perf_counter()
+    failed = 0
+    with context.Pool(workers, initializer=_init_worker,
+                      initargs=(args.model, threads, args.llm, args.llm_url, args.api_key, not args.no_trim)) as pool, \
+            open(args.out, "a+") as out:
+        out.seek(0, os.SEEK_END)
+        if out.tell():
+            out.seek(out.tell() - 1)
+            if out.read(1) != "\n":
+                out.write("\n") #the last run died mid line, start clean
+        for i, record in enumerate(pool.imap_unordered(process_file, todo), 1):
+            out.write(json.dumps(record) + "\n")
+            out.flush() #a crash loses at most the files still in flight
+            if "error" in record:
+                failed += 1
+                print(f"[{i}/{len(todo)}] {record['file']}: {record['error']}")
+            else:
+                print(f"[{i}/{len(todo)}] {record['file']}: {record.get('transcript', '')[:60]}")
+    minutes = (time.perf_counter() - start) / 60
+    print(f"\n{len(todo) - failed} done, {failed} failed in {minutes * 60:.1f} s "
+          f"({len(todo) / minutes:.1f} files per minute with {workers} workers x {threads} threads)")
+
+
+if __name__ == "__main__":
+    main()
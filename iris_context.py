@@ -0,0 +1,134 @@
+"""
+IRIS - Conversation context
+
+Keeps what is sent to the LLM bounded. Recent turns are kept word for
+word within a token budget; older turns are folded into a running summary
+that goes into the context prompt instead. Request size, and with it the
+LLM latency, stays about the same no matter how long the session runs.
+"""
+
+import re #first sentence of a message
+import threading #background summaries
+
+
+def estimate_tokens(text):
+    #rough token count, about 4 characters per token for english
+    return max(1, (len(text) + 3) // 4)
+
+
+def _gist(text, words=25):
+    #first sentence of a message, cut to a few words
+    sentence = re.split(r"(?<=[.!?])\s", text.strip(), maxsplit=1)[0]
+    parts = sentence.split()
+    return " ".join(parts[:words]) + (" ..." if len(parts) > words else "")
+
+
+def extractive_summary(previous, folded, budget):
+    #cheap summary without an LLM: one short line per folded message, oldest lines go first when over budget
+    lines = [line for line in previous.split("\n") if line]
+    for message in folded:
+        who = "I told you" if message['author'] == 'user' else "You told me"
+        lines.append(f"{who}: {_gist(message['content'])}")
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > budget:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class ConversationContext:
+    """
+    The ConversationContext class holds the conversation history for the
+    LLM: the most recent messages verbatim within `budget` tokens and a
+    summary of everything older within `summary_budget` tokens.
+    """
+    def __init__(self, budget=1500, summary_budget=300, min_recent=2, summarize=None):
+        #budget: tokens allowed for verbatim recent messages
+        #summary_budget: tokens allowed for the summary of older messages
+        #min_recent: never fold the newest messages even if they are over budget on their own
+        #summarize: optional function (previous_summary, folded_messages) -> summary, e.g. an LLM call.
+        #           it runs in the background, the cheap extractive summary is used until it returns
+        self.budget = budget
+        self.summary_budget = summary_budget
+        self.min_recent = min_recent
+        self.summarize = summarize
+        self.recent = [] #{'author', 'content', 'tokens'}
+        self.recent_tokens = 0
+        self.summary = ""
+        self.turns = 0
+        self._lock = threading.Lock()
+        self._summarizing = False
+        self._pending = [] #folded messages the background summary has not seen yet
+        self._llm_summary = "" #last summary returned by summarize
+
+    def add(self, author, content):
+        #author: 'user' or 'AI', like palm.chat messages
+        tokens = estimate_tokens(content)
+        with self._lock:
+            self.recent.append({'author': author, 'content': content, 'tokens': tokens})
+            self.recent_tokens += tokens
+            if author == 'user':
+                self.turns += 1
+            folded = self._trim()
+        if folded:
+            self._fold(folded)
+
+    def _trim(self):
+        #drop the oldest messages until the recent ones fit the budget, returns what was dropped
+        folded = []
+        while len(self.recent) > self.min_recent and self.recent_tokens > self.budget:
+            message = self.recent.pop(0)
+            self.recent_tokens -= message['tokens']
+            folded.append(message)
+        #the history sent to the LLM should start with something the user said
+        while folded and len(self.recent) > self.min_recent and self.recent[0]['author'] != 'user':
+            message = self.recent.pop(0)
+            self.recent_tokens -= message['tokens']
+            folded.append(message)
+        return folded
+
+    def _fold(self, folded):
+        with self._lock:
+            self.summary = extractive_summary(self.summary, folded, self.summary_budget)
+            if self.summarize is None:
+                return
+            self._pending.extend(folded)
+            if self._summarizing:
+                return #the running summary picks these up when it is done
+            self._summarizing = True
+        threading.Thread(target=self._summarize_pending, name="context-summary", daemon=True).start()
+
+    def _summarize_pending(self):
+        #background worker, keeps summarizing until nothing is pending
+        while True:
+            with self._lock:
+                folded, self._pending = self._pending, []
+                if not folded:
+                    self._summarizing = False
+                    return
+                base = self._llm_summary
+            try:
+                summary = self.summarize(base, folded).strip()
+            except Exception as e:
+                # the extractive summary is already in place, build on it next time so nothing is lost
+                print("Error summarizing conversation:", str(e))
+                with self._lock:
+                    self._llm_summary = self.summary
+                continue
+            if estimate_tokens(summary) > self.summary_budget:
+                summary = summary[:self.summary_budget * 4]
+            with self._lock:
+                self._llm_summary = summary
+                #anything folded while we were busy is added the cheap way until the next round
+                self.summary = extractive_summary(summary, self._pending, self.summary_budget)
+
+    def messages(self):
+        #recent history in the format palm.chat expects
+        with self._lock:
+            return [{'author': m['author'], 'content': m['content']} for m in self.recent]
+
+    def context_prompt(self, base):
+        #the context prompt with the summary of older turns appended
+        with self._lock:
+            summary = self.summary
+        if not summary:
+            return base
+        return f"{base}\nWhat we talked about earlier in this conversation:\n{summary}"
@@ -0,0 +1,99 @@
+"""
+IRIS - Few-shot example selection
+
+A tiny in-process search index over the hand written (user, reply)
+examples. Every example is turned into a TF-IDF weighted vector of hashed
+word and character n-grams, stored as columns of one NumPy matrix. For each
+user utterance only the few most similar examples (cosine similarity)
+are sent to the LLM, so the prompt gets relevant grounding while its
+size stays small and fixed.
+"""
+
+import re #tokenising
+import zlib #stable hashing of n-grams, python's hash() changes between runs
+import numpy as np #the index matrix
+
+
+#words that appear in almost every message and say nothing about what it is about
+STOP_WORDS = frozenset("""
+a an and are am be been but by can do for from had has have he her hi hey his i i'm i've im is it it's
+just me my of on or so that the them then there they this to was we were what with you your
+""".split())
+
+
+def validate_examples(examples):
+    #check the corpus on load, returns the clean (user, reply) pairs
+    #bad entries are reported and skipped so one typo doesn't take IRIS down
+    clean = []
+    seen = set()
+    for i, example in enumerate(examples):
+        if not (isinstance(example, tuple) and len(example) == 2
+                and all(isinstance(text, str) and text.strip() for text in example)):
+            print(f"Skipping example {i}, expected a (user, reply) pair of strings but got: {example!r:.120}")
+            continue
+        user, reply = example[0].strip(), example[1].strip()
+        if user.lower() in seen:
+            print(f"Skipping example {i}, duplicate of an earlier user message: {user!r:.80}")
+            continue
+        seen.add(user.lower())
+        clean.append((user, reply))
+    return clean
+
+
+class ExampleIndex:
+    """
+    The ExampleIndex class finds the examples whose user message is most
+    similar to a new utterance. Build it once at startup, query it per turn.
+    """
+    def __init__(self, examples, dim=1 << 14, char_ngrams=(3, 4, 5)):
+        #examples: list of (user, reply) pairs, validated on load
+        #dim: number of hash buckets, collisions are rare at this size for a few hundred examples
+        #char_ngrams: character n-gram sizes, they make the match robust to typos and word forms
+        self.examples = validate_examples(examples)
+        self.dim = dim
+        self.char_ngrams = char_ngrams
+        rows = [self._counts(user) for user, _ in self.examples]
+        #inverse document frequency, rare n-grams say more about a message than common ones
+        df = np.zeros(dim, dtype=np.float32)
+        for buckets, _ in rows:
+            df[buckets] += 1
+        self.idf = np.log((1 + len(rows)) / (1 + df)).astype(np.float32) + 1
+        #stored one row per bucket and one column per example, so a query reads a few contiguous rows
+        self.matrix = np.zeros((dim, len(rows)), dtype=np.float32)
+        for i, (buckets, counts) in enumerate(rows):
+            self.matrix[buckets, i] = counts * self.idf[buckets]
+        norms = np.linalg.norm(self.matrix, axis=0, keepdims=True)
+        self.matrix /= np.maximum(norms, 1e-6)
+
+    def _features(self, text):
+        words = [w for w in re.findall(r"[a-z0-9']+", text.lower()) if w not in STOP_WORDS]
+        features = ["w:" + word for word in words]
+        for word in words:
+            word = f" {word} " #n-grams at the start and end of a word are marked
+            for n in self.char_ngrams:
+                features += ["c:" + word[i:i + n] for i in range(len(word) - n + 1)]
+        return features
+
+    def _counts(self, text):
+        #hashed n-gram counts as (bucket indices, counts)
+        buckets = np.array([zlib.crc32(f.encode("utf-8")) % self.dim for f in self._features(text)], dtype=np.int64)
+        if len(buckets) == 0:
+            return buckets, np.zeros(0, dtype=np.float32)
+        buckets, counts = np.unique(buckets, return_counts=True)
+        return buckets, counts.astype(np.float32)
+
+    def search(self, text, k=3, min_score=0.05):
+        #returns up to k (user, reply) examples most similar to text, best first
+        if not self.examples:
+            return []
+        buckets, counts = self._counts(text)
+        if len(buckets) == 0:
+            return []
+        weights = counts * self.idf[buckets]
+        weights /= max(float(np.linalg.norm(weights)), 1e-6)
+        #only the query's buckets are non zero, so only those rows take part in the dot product
+        scores = weights @ self.matrix[buckets]
+        k = min(k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [self.examples[i] for i in best if scores[i] >= min_score]
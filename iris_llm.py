@@ -0,0 +1,284 @@
+"""
+IRIS - LLM backends
+
+Everything the conversation loop needs from a language model sits behind
+one small interface: stream(messages, context, examples) yields the reply
+in pieces as it is generated, so speech can start on the first sentence.
+
+    PalmBackend   google palm chat (the original IRIS backend, not streamed)
+    HTTPBackend   any server speaking the small streaming JSON protocol below,
+                  over one pooled keep-alive session with deadlines and retries
+    LocalBackend  deterministic replies in process, for offline runs and tests
+
+The protocol: POST {url}/v1/chat with a JSON body
+    {"messages": [{"author", "content"}], "context": str, "examples": [[user, reply]],
+     "temperature": float, "stream": true}
+answered with newline delimited JSON objects {"text": "..."} and a final {"done": true}.
+StandInServer serves it locally with LocalBackend replies, so load tests and
+latency measurements don't depend on a live external API:
+
+    python iris_llm.py --port 8765 --first-token-ms 300 --token-ms 20
+"""
+
+import argparse #stand in server options
+import json #request and response bodies
+import re #splitting replies into tokens
+import threading #stand in server thread
+import time #deadlines and simulated latency
+import zlib #stable choice of canned replies
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class LLMError(Exception):
+    """Raised when a backend could not produce a reply in time."""
+
+
+class LLMBackend:
+    """
+    The LLMBackend class is the interface every backend implements.
+    Subclasses override stream(); chat() just joins it.
+    """
+    def stream(self, messages, context="", examples=(), temperature=0.8):
+        #messages: [{'author': 'user' or 'AI', 'content': str}], newest last
+        #context: system style prompt, examples: (user, reply) pairs
+        #yields pieces of the reply text as they are generated
+        raise NotImplementedError
+
+    def chat(self, messages, context="", examples=(), temperature=0.8):
+        #the whole reply as one string
+        return "".join(self.stream(messages, context, examples, temperature))
+
+    def close(self):
+        #free pooled connections, if any
+        pass
+
+
+class PalmBackend(LLMBackend):
+    """
+    The PalmBackend class calls google palm chat. Palm returns the whole
+    reply at once, so the stream has a single piece. Calls are retried a
+    few times and bounded by a deadline.
+    """
+    def __init__(self, api_key, model="models/chat-bison-001", timeout=20.0, retries=2):
+        import google.generativeai as palm #generate content
+        palm.configure(api_key=api_key)
+        self.palm = palm
+        self.model = model
+        self.timeout = timeout
+        self.retries = retries
+
+    def stream(self, messages, context="", examples=(), temperature=0.8):
+        deadline = time.monotonic() + self.timeout
+        for attempt in range(self.retries + 1):
+            result = {}
+
+            def call():
+                try:
+                    result["response"] = self.palm.chat(model=self.model, messages=messages, context=context,
+                                                        examples=list(examples) or None, temperature=temperature)
+                except Exception as e:
+                    result["error"] = e
+
+            #palm.chat has no timeout of its own, so it runs on a thread we can stop waiting for
+            worker = threading.Thread(target=call, daemon=True)
+            worker.start()
+            worker.join(max(0.0, deadline - time.monotonic()))
+            if "response" in result:
+                yield result["response"].last or ""
+                return
+            if worker.is_alive():
+                raise LLMError(f"palm did not answer within {self.timeout:.0f} s")
+            print(f"Error from palm (attempt {attempt + 1}):", str(result["error"]))
+            if time.monotonic() + 0.5 * 2 ** attempt >= deadline:
+                break
+            time.sleep(0.5 * 2 ** attempt)
+        raise LLMError("palm failed to reply")
+
+
+class HTTPBackend(LLMBackend):
+    """
+    The HTTPBackend class talks to a streaming chat server over one
+    requests.Session, so TCP (and TLS) connections are pooled and reused
+    between turns. Connecting and each read have their own timeouts, the
+    whole call has a deadline, and failures before the first piece of the
+    reply are retried with backoff.
+    """
+    def __init__(self, url, timeout=20.0, connect_timeout=3.0, read_timeout=10.0, retries=2, pool_size=4, headers=None):
+        import requests #pooled http
+        from requests.adapters import HTTPAdapter
+        self.url = url.rstrip("/") + "/v1/chat"
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.requests = requests
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0) #we retry ourselves
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if headers:
+            self.session.headers.update(headers)
+
+    def stream(self, messages, context="", examples=(), temperature=0.8):
+        body = {"messages": messages, "context": context, "examples": [list(e) for e in examples],
+                "temperature": temperature, "stream": True}
+        deadline = time.monotonic() + self.timeout
+        for attempt in range(self.retries + 1):
+            started = False #once text has been handed out a retry would repeat it
+            try:
+                remaining = deadline - time.monotonic()
+                timeout = (min(self.connect_timeout, remaining), min(self.read_timeout, remaining))
+                with self.session.post(self.url, json=body, stream=True, timeout=timeout) as response:
+                    response.raise_for_status()
+                    for line in response.iter_lines():
+                        if not line:
+                            continue
+                        if time.monotonic() > deadline:
+                            raise LLMError(f"reply took longer than {self.timeout:.0f} s")
+                        piece = json.loads(line)
+                        #after {"done"} the loop still reads the end of the body, so the connection goes back to the pool
+                        if piece.get("text"):
+                            started = True
+                            yield piece["text"]
+                return
+            except (self.requests.RequestException, ValueError) as e:
+                if started:
+                    raise LLMError(f"reply stream broke off: {e}") from e
+                print(f"Error from {self.url} (attempt {attempt + 1}):", str(e))
+                backoff = 0.2 * 2 ** attempt
+                if time.monotonic() + backoff >= deadline:
+                    break
+                time.sleep(backoff)
+        raise LLMError(f"{self.url} failed to reply")
+
+    def close(self):
+        self.session.close()
+
+
+#canned replies for LocalBackend, in the tone of the examples
+_LOCAL_REPLIES = [
+    "I hear you. That sounds like a lot to carry. What has been the hardest part of it for you?",
+    "Thank you for sharing that with me. How did it make you feel when it happened?",
+    "That's understandable. It's okay to feel this way. What do you think would help you right now?",
+    "I'm really glad you told me. Have you been able to talk to anyone else about this?",
+    "That sounds wonderful, I'm happy for you! What are you most looking forward to now?",
+    "It's natural to feel unsure. Let's take it one step at a time. What is the first small step you could take?",
+]
+
+
+def _tokens(text):
+    #split into word sized pieces that keep their spaces, like an LLM token stream
+    return re.findall(r"\s*\S+", text)
+
+
+class LocalBackend(LLMBackend):
+    """
+    The LocalBackend class gives deterministic replies without any network
+    or model: the same conversation always gets the same reply. Optional
+    delays simulate the first token and per token latency of a real model.
+    """
+    def __init__(self, first_token_delay=0.0, token_delay=0.0, replies=None):
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.replies = replies or _LOCAL_REPLIES
+
+    def reply_for(self, messages):
+        last = next((m['content'] for m in reversed(messages) if m['author'] == 'user'), "")
+        return self.replies[zlib.crc32(last.strip().lower().encode("utf-8")) % len(self.replies)]
+
+    def stream(self, messages, context="", examples=(), temperature=0.8):
+        if self.first_token_delay:
+            time.sleep(self.first_token_delay)
+        for i, token in enumerate(_tokens(self.reply_for(messages))):
+            if i and self.token_delay:
+                time.sleep(self.token_delay)
+            yield token
+
+
+class StandInServer:
+    """
+    The StandInServer class serves the streaming chat protocol on localhost
+    with LocalBackend replies, in a background thread.
+    """
+    def __init__(self, host="127.0.0.1", port=0, backend=None):
+        #port 0 picks a free port, see .url
+        backend = backend or LocalBackend()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" #keep-alive, so clients can reuse connections
+
+            def do_POST(self):
+                if self.path != "/v1/chat":
+                    self.send_error(404)
+                    return
+                try:
+                    body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                    messages = body["messages"]
+                except (ValueError, KeyError):
+                    self.send_error(400)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    for token in backend.stream(messages, body.get("context", ""), body.get("examples", ())):
+                        self._chunk(json.dumps({"text": token}) + "\n")
+                    self._chunk(json.dumps({"done": True}) + "\n")
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    #the client stopped reading, e.g. IRIS was interrupted, that's normal
+                    self.close_connection = True
+
+            def _chunk(self, text):
+                data = text.encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def log_message(self, *args):
+                pass #keep the console for IRIS output
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="llm-stand-in", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def make_backend(name, url=None, api_key=None, model="models/chat-bison-001", timeout=20.0):
+    #name: "palm", "http" or "local"
+    if name == "http":
+        return HTTPBackend(url, timeout=timeout)
+    if name == "local":
+        return LocalBackend()
+    if name == "palm":
+        return PalmBackend(api_key, model=model, timeout=timeout)
+    raise ValueError(f"unknown LLM backend {name!r}, expected palm, http or local")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="local stand-in LLM server for IRIS")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--first-token-ms", type=float, default=0.0, help="simulated time to first token")
+    parser.add_argument("--token-ms", type=float, default=0.0, help="simulated time per following token")
+    args = parser.parse_args()
+    backend = LocalBackend(args.first_token_ms / 1000, args.token_ms / 1000)
+    server = StandInServer(args.host, args.port, backend)
+    print(f"IRIS stand-in LLM listening on {server.url}/v1/chat")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
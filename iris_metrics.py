@@ -0,0 +1,124 @@
+"""
+IRIS - Latency metrics
+
+Records when each stage of a turn happens and turns that into per stage
+latencies, so it is clear where a turn's time goes:
+
+    capture_end      the user stopped speaking
+    transcribed      whisper returned the text
+    llm_first_token  the first piece of the reply arrived
+    llm_done         the whole reply arrived
+    first_audio      IRIS started talking
+    playback_end     IRIS finished talking
+
+Latencies are kept per stage and exported as p50/p95/p99 plus a
+histogram to JSON.
+"""
+
+import contextlib #measure() context manager
+import json #export
+import threading #stages mark from several threads
+import time #timestamps
+import numpy as np #percentiles and histograms
+
+
+#stage name -> (from event, to event)
+STAGES = {
+    "transcription": ("capture_end", "transcribed"),
+    "llm_first_token": ("transcribed", "llm_first_token"),
+    "llm_complete": ("transcribed", "llm_done"),
+    "tts_first_audio": ("llm_first_token", "first_audio"),
+    "turn_latency": ("capture_end", "first_audio"), #what the user feels: stop talking -> hear IRIS
+    "playback": ("first_audio", "playback_end"),
+    "turn_total": ("capture_end", "playback_end"),
+}
+
+#histogram bucket edges in milliseconds, roughly logarithmic
+BUCKETS_MS = [0, 5, 10, 25, 50, 100, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000, 30000]
+
+
+def summarize(samples):
+    #samples: durations in seconds -> count, mean, p50/p95/p99, max (all in ms) and histogram
+    ms = np.asarray(samples, dtype=np.float64) * 1000
+    if len(ms) == 0:
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    counts, _ = np.histogram(ms, bins=BUCKETS_MS + [float("inf")])
+    return {
+        "count": int(len(ms)),
+        "mean_ms": round(float(ms.mean()), 2),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "max_ms": round(float(ms.max()), 2),
+        "histogram": {"bucket_start_ms": BUCKETS_MS, "counts": counts.tolist()},
+    }
+
+
+class LatencyRecorder:
+    """
+    The LatencyRecorder class collects event timestamps per turn and
+    durations per stage. It is thread safe and cheap enough to leave on.
+    """
+    def __init__(self, on_turn_complete=None):
+        #on_turn_complete(turn, stage_durations): called when a turn's playback_end is marked
+        self.on_turn_complete = on_turn_complete
+        self.events = {} #turn -> {event: perf_counter time}
+        self.samples = {} #stage -> [seconds]
+        self._lock = threading.Lock()
+
+    def mark(self, turn, event, when=None):
+        #record that event happened for turn now (or at `when`, a perf_counter time)
+        when = time.perf_counter() if when is None else when
+        with self._lock:
+            events = self.events.setdefault(turn, {})
+            if event in events:
+                return #only the first time counts, e.g. the first sentence's audio
+            events[event] = when
+            durations = {}
+            for stage, (start, end) in STAGES.items():
+                if end == event and start in events:
+                    durations[stage] = when - events[start]
+                    self.samples.setdefault(stage, []).append(durations[stage])
+        if event == "playback_end" and self.on_turn_complete is not None:
+            self.on_turn_complete(turn, self.turn_durations(turn))
+
+    def add(self, stage, seconds):
+        #record a duration that is not tied to turn events, e.g. a GUI update
+        with self._lock:
+            self.samples.setdefault(stage, []).append(seconds)
+
+    @contextlib.contextmanager
+    def measure(self, stage):
+        #with metrics.measure("gui_update"): ...
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def turn_durations(self, turn):
+        #stage -> seconds for one turn, only stages whose both events were seen
+        with self._lock:
+            events = dict(self.events.get(turn, {}))
+        return {stage: events[end] - events[start] for stage, (start, end) in STAGES.items()
+                if start in events and end in events}
+
+    def report(self):
+        #everything as a dict ready for json
+        with self._lock:
+            samples = {stage: list(values) for stage, values in self.samples.items()}
+            turns = len(self.events)
+        return {"turns": turns, "stages": {stage: summarize(values) for stage, values in sorted(samples.items())}}
+
+    def export(self, path):
+        #write the report to a json file
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+    def print_report(self):
+        #short table on the console
+        print(f"{'stage':<18}{'n':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for stage, stats in self.report()["stages"].items():
+            if stats["count"]:
+                print(f"{stage:<18}{stats['count']:>5}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
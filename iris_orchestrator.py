@@ -0,0 +1,260 @@
+"""
+IRIS - Conversation orchestrator
+
+Runs a conversation as concurrent asyncio stages connected by small
+bounded queues:
+
+    capture -> transcription -> LLM -> TTS -> playback
+
+The microphone is armed again as soon as an utterance has been captured,
+so the user can speak while IRIS is still thinking or talking. When new
+speech starts, everything still in flight for the previous turn (reply,
+synthesis, playback) is cancelled, which is what makes barge-in work.
+The blocking pieces (recording, whisper, the LLM call, synthesis) run on
+worker threads so they never stall the event loop.
+"""
+
+import asyncio #the stages and queues
+import threading #cancel events shared with the worker threads
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from iris_tts import SentenceStream
+
+
+class ConversationOrchestrator:
+    """
+    The ConversationOrchestrator class wires the blocking building blocks
+    of IRIS into a pipelined, interruptible conversation loop.
+    Every utterance starts a new turn; items from older turns are dropped
+    by every stage they reach.
+    """
+    def __init__(self, capture, transcribe, chat, speech, on_user_text=None, on_reply=None,
+                 is_goodbye=None, on_goodbye=None, farewell=None, on_speaking=None,
+                 barge_in=True, queue_size=2, metrics=None, cancel_capture=None):
+        #capture(on_speech_start): records one utterance and returns a handle for transcribe, blocking
+        #transcribe(handle): handle -> text (or None if it failed), blocking
+        #chat(text): user text -> reply text, or an iterator of reply pieces for streamed replies, blocking
+        #speech: SpeechPipeline used to render and play replies
+        #on_user_text(text) / on_reply(text): show text to the user
+        #is_goodbye(text): True ends the conversation after farewell is spoken
+        #on_goodbye(): called once the conversation is ending
+        #on_speaking(bool): told when IRIS starts and stops talking, e.g. to make the VAD less sensitive
+        #barge_in: new speech cancels the reply that is being prepared or spoken
+        #queue_size: bound of every queue between two stages
+        #metrics: LatencyRecorder that gets every turn's stage timestamps, None records nothing
+        #cancel_capture(): ends a capture that is still waiting for the user, called when the conversation ends
+        self.capture = capture
+        self.transcribe = transcribe
+        self.chat = chat
+        self.speech = speech
+        self.on_user_text = on_user_text
+        self.on_reply = on_reply
+        self.is_goodbye = is_goodbye
+        self.on_goodbye = on_goodbye
+        self.farewell = farewell
+        self.on_speaking = on_speaking
+        self.barge_in = barge_in
+        self.queue_size = queue_size
+        self.metrics = metrics
+        self.cancel_capture = cancel_capture
+        self.turn = 0 #id of the newest turn, older items are stale
+        self.speaking = False
+        self._cancel = threading.Event() #set to stop the current turn's synthesis and playback
+        self._finished = None
+        self._loop = None
+        #transcription, the LLM and synthesis can block for a while, so they get their own threads
+        self._executor = ThreadPoolExecutor(max_workers=6, thread_name_prefix="iris-stage")
+
+    async def _run_blocking(self, function, *args):
+        return await self._loop.run_in_executor(self._executor, function, *args)
+
+    async def _run_capture(self, on_speech_start):
+        #capture can wait for the user forever, so it runs on a daemon thread that can't keep the process alive at exit
+        future = Future()
+
+        def run():
+            try:
+                result = self.capture(on_speech_start)
+            except BaseException as e:
+                result, error = None, e
+            else:
+                error = None
+            if future.cancelled():
+                return #the conversation ended while this capture was waiting
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+        threading.Thread(target=run, name="iris-capture", daemon=True).start()
+        return await asyncio.wrap_future(future)
+
+    def _mark(self, turn, event):
+        if self.metrics is not None:
+            self.metrics.mark(turn, event)
+
+    def _show(self, callback, text):
+        #GUI / console update, runs on the event loop so it must be quick
+        if callback is not None:
+            callback(text)
+
+    def stop(self):
+        #end the conversation from any thread without a goodbye
+        self._loop.call_soon_threadsafe(self._finished.set)
+
+    def _speech_started(self):
+        #called from the recording thread when the user starts talking
+        self._loop.call_soon_threadsafe(self._new_turn)
+
+    def _new_turn(self):
+        self.turn += 1
+        if self.barge_in and self.speaking:
+            self.interrupt()
+
+    def interrupt(self):
+        #stop whatever IRIS is saying and drop its queued sentences
+        self._cancel.set()
+        self.speech.stop()
+        self._set_speaking(False)
+
+    def _set_speaking(self, speaking):
+        if speaking != self.speaking:
+            self.speaking = speaking
+            if self.on_speaking is not None:
+                self.on_speaking(speaking)
+
+    async def _capture_stage(self, out):
+        while not self._finished.is_set():
+            handle = await self._run_capture(self._speech_started)
+            if handle is not None:
+                self._mark(self.turn, "capture_end")
+                await out.put((self.turn, handle))
+
+    async def _transcribe_stage(self, inbox, out):
+        while True:
+            turn, handle = await inbox.get()
+            text = await self._run_blocking(self.transcribe, handle)
+            if not text or not text.strip():
+                continue
+            self._mark(turn, "transcribed")
+            self._show(self.on_user_text, text)
+            if self.is_goodbye is not None and self.is_goodbye(text):
+                await self._say_goodbye()
+                return
+            await out.put((turn, text))
+
+    async def _llm_stage(self, inbox, out):
+        while True:
+            turn, text = await inbox.get()
+            if turn != self.turn:
+                continue #the user already started saying something else
+            self._cancel.clear()
+            reply = await self._stream_reply(turn, text, out)
+            if reply:
+                self._show(self.on_reply, reply)
+            if turn == self.turn:
+                await out.put((turn, None)) #end of reply
+
+    async def _stream_reply(self, turn, text, out):
+        #hand every sentence to TTS as soon as it is complete, returns the reply text
+        reply = ""
+        sentences = SentenceStream()
+        pieces = None
+        try:
+            pieces = await self._run_blocking(self.chat, text)
+            pieces = iter([pieces]) if isinstance(pieces, str) else iter(pieces)
+            while turn == self.turn:
+                piece = await self._run_blocking(next, pieces, None)
+                if piece is not None and not reply:
+                    self._mark(turn, "llm_first_token")
+                if piece is None:
+                    self._mark(turn, "llm_done")
+                    for sentence in sentences.flush():
+                        await out.put((turn, sentence))
+                    break
+                reply += piece
+                for sentence in sentences.feed(piece):
+                    await out.put((turn, sentence))
+        except Exception as e:
+            print("Error getting a reply:", str(e))
+        finally:
+            if pieces is not None and hasattr(pieces, "close"):
+                await self._run_blocking(pieces.close) #interrupted, stop generating
+        return reply
+
+    async def _tts_stage(self, inbox, out):
+        while True:
+            turn, sentence = await inbox.get()
+            if turn != self.turn:
+                continue
+            if sentence is None:
+                await out.put((turn, None))
+                continue
+            try:
+                pcm = await self._run_blocking(self.speech.render, sentence)
+            except Exception as e:
+                print("Error during speech synthesis:", str(e))
+                continue
+            if turn == self.turn:
+                await out.put((turn, pcm))
+
+    async def _playback_stage(self, inbox):
+        while True:
+            turn, pcm = await inbox.get()
+            if turn != self.turn or self._cancel.is_set():
+                continue
+            if pcm is None:
+                await self._run_blocking(self.speech.wait_done, self._cancel)
+                self._set_speaking(False)
+                if not self._cancel.is_set():
+                    self._mark(turn, "playback_end")
+                continue
+            self._set_speaking(True)
+            self._mark(turn, "first_audio")
+            await self._run_blocking(self.speech.enqueue, pcm, self._cancel)
+
+    async def _say_goodbye(self):
+        #the conversation ends, cancel anything in flight and say the farewell
+        self.turn += 1
+        self.interrupt()
+        if self.on_goodbye is not None:
+            self.on_goodbye()
+        if self.farewell:
+            self._cancel.clear()
+            self._set_speaking(True)
+            await self._run_blocking(self.speech.speak, self.farewell)
+            self._set_speaking(False)
+        self._finished.set()
+
+    async def run(self):
+        #run the conversation until the user says goodbye, an error in any stage ends it and is raised here
+        self._loop = asyncio.get_running_loop()
+        self._finished = asyncio.Event()
+        captured = asyncio.Queue(self.queue_size)
+        texts = asyncio.Queue(self.queue_size)
+        sentences = asyncio.Queue(self.queue_size)
+        audio = asyncio.Queue(self.queue_size)
+        stages = [
+            asyncio.create_task(self._capture_stage(captured), name="capture"),
+            asyncio.create_task(self._transcribe_stage(captured, texts), name="transcription"),
+            asyncio.create_task(self._llm_stage(texts, sentences), name="llm"),
+            asyncio.create_task(self._tts_stage(sentences, audio), name="tts"),
+            asyncio.create_task(self._playback_stage(audio), name="playback"),
+        ]
+        finished = asyncio.create_task(self._finished.wait())
+        try:
+            #a stage that dies would leave the others waiting on its queue forever, so it ends the conversation
+            done, _ = await asyncio.wait([finished, *stages], return_when=asyncio.FIRST_COMPLETED)
+            for stage in stages:
+                if stage in done and not stage.cancelled() and stage.exception() is not None:
+                    print(f"Error in the {stage.get_name()} stage:", str(stage.exception()))
+                    raise stage.exception()
+        finally:
+            finished.cancel()
+            for stage in stages:
+                stage.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+            #a recording may still be waiting for the user, end it instead of waiting for Enter
+            if self.cancel_capture is not None:
+                self.cancel_capture()
+            self._executor.shutdown(wait=False, cancel_futures=True)
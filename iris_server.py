@@ -0,0 +1,313 @@
+"""
+IRIS - Server mode
+
+Hosts many IRIS conversations at once. Every client connection is a
+session with its own conversation history and turn counter. The Whisper
+model, the LLM backend and the example index are shared, and utterances
+from all sessions are transcribed in dynamic batches by one
+BatchScheduler. When the scheduler is full a client is told to retry
+later instead of waiting in an ever growing queue.
+
+The protocol is newline delimited JSON over TCP, one connection per session.
+
+    client -> server
+        {"type": "audio", "pcm": base64 16 bit mono PCM, "rate": 16000}  one utterance, cut by the client's VAD
+        {"type": "text", "text": "..."}  typed message, skips transcription
+        {"type": "stats"}                batching statistics
+        {"type": "bye"}
+    server -> client
+        {"type": "ready", "session": id}
+        {"type": "transcript", "turn": n, "text": "..."}
+        {"type": "reply", "turn": n, "text": "..."}       the reply in pieces as it is generated
+        {"type": "reply_done", "turn": n, "text": "..."}  the whole reply, empty if nothing was heard
+        {"type": "busy", "retry_after": seconds}          utterance refused, send it again later
+        {"type": "stats", ...}
+        {"type": "error", "message": "..."}
+
+Speech synthesis stays on the client, the server only sends text.
+
+usage: python iris_server.py --port 8770 --llm local [--stt simulated]
+"""
+
+import argparse #command line options
+import asyncio #one task per session
+import base64 #audio inside json
+import itertools #session ids
+import json #the protocol
+import os #api key from the environment
+import time #simulated whisper
+import zlib #stable choice of simulated transcripts
+from concurrent.futures import ThreadPoolExecutor
+
+from iris_audio import WHISPER_RATE, pcm16_to_float, resample
+from iris_context import ConversationContext
+from iris_examples import ExampleIndex
+from iris_llm import make_backend
+from iris_persona import examples, iris_context_prompt
+from iris_stt import BatchScheduler, Overloaded, WhisperRegistry
+
+
+#longest line the server reads, a 30 s utterance is about 1.3 MB of base64
+MAX_MESSAGE_BYTES = 8 * 1024 * 1024
+
+#what SimulatedWhisper "hears"
+_SIMULATED_TRANSCRIPTS = [
+    "I had a really long day at work today.",
+    "I can't sleep, I keep thinking about my exams.",
+    "My friend and I had a fight and I don't know what to do.",
+    "I finally finished my project!",
+    "I feel a bit lonely since I moved to a new city.",
+]
+
+
+class SimulatedWhisper:
+    """
+    The SimulatedWhisper class stands in for WhisperRegistry when there is
+    no model: a batch takes batch_ms plus item_ms per utterance, which is
+    roughly how batched decoding costs grow, and returns canned text.
+    """
+    def __init__(self, batch_ms=250.0, item_ms=25.0):
+        self.batch_ms = batch_ms
+        self.item_ms = item_ms
+
+    def transcribe_batch(self, audios):
+        time.sleep((self.batch_ms + self.item_ms * len(audios)) / 1000)
+        #the first few samples are enough to tell utterances apart
+        return [_SIMULATED_TRANSCRIPTS[zlib.crc32(audio[:256].tobytes()) % len(_SIMULATED_TRANSCRIPTS)]
+                for audio in audios]
+
+
+class Session:
+    """
+    The Session class is one client's conversation. Nothing in it is
+    shared with other sessions.
+    """
+    def __init__(self, session_id, writer, context_budget=1500, summary_budget=300):
+        self.id = session_id
+        self.turn = 0
+        self.conversation = ConversationContext(budget=context_budget, summary_budget=summary_budget)
+        self._writer = writer
+        self._send_lock = asyncio.Lock() #replies and busy notices can be sent at the same time
+
+    async def send(self, message):
+        async with self._send_lock:
+            self._writer.write(json.dumps(message).encode("utf-8") + b"\n")
+            await self._writer.drain()
+
+
+class IrisServer:
+    """
+    The IrisServer class accepts sessions and runs their turns: transcribe
+    through the shared scheduler, then stream the reply from the shared LLM.
+    """
+    def __init__(self, scheduler, llm, host="127.0.0.1", port=8770, max_sessions=64, session_queue=2,
+                 few_shot_examples=3, context_budget=1500, llm_workers=32):
+        #scheduler: BatchScheduler for all sessions' audio
+        #llm: LLMBackend shared by all sessions
+        #max_sessions: more connections than this are turned away
+        #session_queue: utterances a session may have waiting, more get a busy reply
+        #llm_workers: threads for blocking LLM calls
+        self.scheduler = scheduler
+        self.llm = llm
+        self.host = host
+        self.port = port
+        self.max_sessions = max_sessions
+        self.session_queue = session_queue
+        self.few_shot_examples = few_shot_examples
+        self.context_budget = context_budget
+        self.example_index = ExampleIndex(examples)
+        self.sessions = {}
+        self._handlers = set() #running connection tasks, finished off by close()
+        self._ids = itertools.count(1)
+        self._executor = ThreadPoolExecutor(max_workers=llm_workers, thread_name_prefix="iris-llm")
+        self._server = None
+
+    async def start(self):
+        #start listening, port 0 picks a free port and self.port is updated
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=MAX_MESSAGE_BYTES)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        for handler in list(self._handlers):
+            handler.cancel()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        await self._server.wait_closed()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {"sessions": len(self.sessions), "pending": self.scheduler.pending, **self.scheduler.report()}
+
+    async def _handle(self, reader, writer):
+        session = Session(next(self._ids), writer, context_budget=self.context_budget)
+        if len(self.sessions) >= self.max_sessions:
+            await session.send({"type": "busy", "retry_after": 1.0})
+            writer.close()
+            return
+        self.sessions[session.id] = session
+        self._handlers.add(asyncio.current_task())
+        inbox = asyncio.Queue(self.session_queue)
+        worker = asyncio.create_task(self._session_loop(session, inbox))
+        try:
+            await session.send({"type": "ready", "session": session.id})
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    await session.send({"type": "error", "message": "not json"})
+                    continue
+                if not isinstance(message, dict):
+                    await session.send({"type": "error", "message": "expected a json object"})
+                    continue
+                kind = message.get("type")
+                if kind == "bye":
+                    break
+                if kind == "stats":
+                    await session.send({"type": "stats", **self.stats()})
+                elif kind in ("audio", "text"):
+                    if inbox.full():
+                        await session.send({"type": "busy", "retry_after": self._retry_after()})
+                    else:
+                        inbox.put_nowait(message)
+                else:
+                    await session.send({"type": "error", "message": f"unknown message type {kind!r}"})
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass #client went away or sent a line that is too long
+        except asyncio.CancelledError:
+            pass #server is closing, this task is the connection callback so nobody else sees it
+        finally:
+            worker.cancel()
+            await asyncio.gather(worker, return_exceptions=True)
+            del self.sessions[session.id]
+            self._handlers.discard(asyncio.current_task())
+            writer.close()
+
+    def _retry_after(self):
+        #rough time until the scheduler has room again
+        batches = self.scheduler.pending / max(1, self.scheduler.max_batch) + 1
+        recent = self.scheduler.decode_times[-10:]
+        return round(batches * (sum(recent) / len(recent) if recent else 0.5), 2)
+
+    async def _session_loop(self, session, inbox):
+        #one turn at a time per session, in the order they were sent
+        while True:
+            message = await inbox.get()
+            try:
+                await self._turn(session, message)
+            except ConnectionError:
+                return
+            except Exception as e:
+                print(f"Error in session {session.id}:", str(e))
+                await session.send({"type": "error", "message": str(e)})
+
+    async def _turn(self, session, message):
+        if message["type"] == "text":
+            text = message.get("text", "")
+        else:
+            rate = int(message.get("rate", WHISPER_RATE))
+            audio = resample(pcm16_to_float(base64.b64decode(message["pcm"])), rate, WHISPER_RATE)
+            try:
+                future = self.scheduler.submit(audio)
+            except Overloaded:
+                await session.send({"type": "busy", "retry_after": self._retry_after()})
+                return
+            text = await asyncio.wrap_future(future)
+        text = text.strip()
+        if not text:
+            await session.send({"type": "reply_done", "turn": session.turn, "text": ""}) #nothing was heard
+            return
+        session.turn += 1
+        turn = session.turn
+        await session.send({"type": "transcript", "turn": turn, "text": text})
+
+        loop = asyncio.get_running_loop()
+        session.conversation.add('user', text)
+        pieces = await loop.run_in_executor(self._executor, self._chat, session, text)
+        reply = ""
+        try:
+            while True:
+                piece = await loop.run_in_executor(self._executor, next, pieces, None)
+                if piece is None:
+                    break
+                reply += piece
+                await session.send({"type": "reply", "turn": turn, "text": piece})
+        finally:
+            if reply:
+                session.conversation.add('AI', reply)
+            if hasattr(pieces, "close"):
+                await loop.run_in_executor(self._executor, pieces.close) #client gone, stop generating
+        await session.send({"type": "reply_done", "turn": turn, "text": reply})
+
+    def _chat(self, session, text):
+        return iter(self.llm.stream(
+            messages=session.conversation.messages(),
+            temperature=0.8,
+            context=session.conversation.context_prompt(iris_context_prompt),
+            examples=self.example_index.search(text, k=self.few_shot_examples)))
+
+
+def make_scheduler(stt="whisper", model="base.en", threads=None, max_batch=8, max_wait=0.05, max_pending=32,
+                   simulated_batch_ms=250.0, simulated_item_ms=25.0):
+    #stt: "whisper" for the real model (loaded before returning) or "simulated"
+    if stt == "simulated":
+        registry = SimulatedWhisper(simulated_batch_ms, simulated_item_ms)
+    else:
+        registry = WhisperRegistry(model_name=model, threads=threads)
+        registry.warm_up(background=False)
+    return BatchScheduler(registry, max_batch=max_batch, max_wait=max_wait, max_pending=max_pending)
+
+
+def add_server_arguments(parser):
+    #options shared with the load generator
+    parser.add_argument("--stt", choices=["whisper", "simulated"], default="whisper")
+    parser.add_argument("--model", default="base.en", help="whisper model size")
+    parser.add_argument("--threads", type=int, default=None, help="torch threads for whisper")
+    parser.add_argument("--max-batch", type=int, default=8, help="most utterances decoded together")
+    parser.add_argument("--max-wait-ms", type=float, default=50.0, help="longest an utterance waits for a batch to fill")
+    parser.add_argument("--max-pending", type=int, default=32, help="utterances queued before clients are told to back off")
+    parser.add_argument("--max-sessions", type=int, default=64)
+    parser.add_argument("--simulated-batch-ms", type=float, default=250.0, help="simulated whisper cost per batch")
+    parser.add_argument("--simulated-item-ms", type=float, default=25.0, help="simulated whisper cost per utterance")
+
+
+def make_server(args, llm, host, port):
+    scheduler = make_scheduler(args.stt, args.model, args.threads, args.max_batch, args.max_wait_ms / 1000,
+                               args.max_pending, args.simulated_batch_ms, args.simulated_item_ms)
+    return IrisServer(scheduler, llm, host=host, port=port, max_sessions=args.max_sessions)
+
+
+async def serve(args):
+    llm = make_backend(args.llm, url=args.llm_url, api_key=args.api_key)
+    server = await make_server(args, llm, args.host, args.port).start()
+    print(f"IRIS server listening on {args.host}:{server.port}")
+    try:
+        await server.serve_forever()
+    finally:
+        server.scheduler.stop()
+        print(json.dumps(server.stats(), indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="serve many IRIS sessions with shared whisper batching")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8770)
+    parser.add_argument("--llm", choices=["palm", "http", "local"], default="local")
+    parser.add_argument("--llm-url", default="http://127.0.0.1:8765")
+    parser.add_argument("--api-key", default=os.environ.get("IRIS_PALM_KEY"))
+    add_server_arguments(parser)
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
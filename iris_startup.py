@@ -0,0 +1,90 @@
+"""
+IRIS - Startup
+
+Runs the slow parts of starting IRIS (loading whisper, opening the
+microphone, starting the mixer, pre-rendering prompts, connecting the LLM)
+in parallel background threads while the GUI is already on screen.
+Every task has its own readiness event, so each part of the app waits
+only for what it actually needs, and the time each task took is kept for
+the startup report.
+"""
+
+import threading #one thread per warm up task
+import time #task durations
+
+
+class WarmUp:
+    """
+    The WarmUp class runs named startup tasks in the background and
+    signals when each of them is done. A task that fails is reported and
+    still counts as done, the real call later will raise the error again.
+    """
+    def __init__(self, parallel=True, started=None):
+        #parallel: False runs the tasks one after another, to compare startup times
+        #started: perf_counter time the app was launched, durations and ready_at are relative to it
+        self.parallel = parallel
+        self.started = time.perf_counter() if started is None else started
+        self.tasks = {} #name -> function
+        self.events = {} #name -> threading.Event set when the task is done
+        self.seconds = {} #name -> how long the task ran
+        self.ready_at = {} #name -> seconds after launch it was done
+        self.errors = {} #name -> exception
+        self.on_ready = None #on_ready(name), called from the task's thread
+
+    def add(self, name, function):
+        #register a task, call before start()
+        self.tasks[name] = function
+        self.events[name] = threading.Event()
+        return self
+
+    def start(self):
+        #start all tasks and return right away
+        if self.parallel:
+            for name in self.tasks:
+                threading.Thread(target=self._run, args=(name,), name=f"warmup-{name}", daemon=True).start()
+        else:
+            def run_all():
+                for name in self.tasks:
+                    self._run(name)
+            threading.Thread(target=run_all, name="warmup", daemon=True).start()
+        return self
+
+    def _run(self, name):
+        start = time.perf_counter()
+        try:
+            self.tasks[name]()
+        except Exception as e:
+            self.errors[name] = e
+            print(f"Error during startup ({name}):", str(e))
+        finally:
+            now = time.perf_counter()
+            self.seconds[name] = now - start
+            self.ready_at[name] = now - self.started
+            self.events[name].set()
+            if self.on_ready is not None:
+                self.on_ready(name)
+
+    def wait(self, *names, timeout=None):
+        #block until the named tasks (all of them if none are named) are done, False on timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for name in names or self.tasks:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not self.events[name].wait(remaining):
+                return False
+        return True
+
+    def is_ready(self, name):
+        return self.events[name].is_set()
+
+    def report(self):
+        #task -> {"seconds", "ready_at", "error"}, ready for json
+        return {name: {"seconds": round(self.seconds[name], 3), "ready_at": round(self.ready_at[name], 3),
+                       "error": str(self.errors[name]) if name in self.errors else None}
+                for name in self.tasks if name in self.seconds}
+
+    def print_report(self):
+        #short table on the console
+        print(f"{'startup task':<14}{'took s':>9}{'ready at s':>12}")
+        for name, task in self.report().items():
+            status = "  failed" if task["error"] else ""
+            print(f"{name:<14}{task['seconds']:>9.2f}{task['ready_at']:>12.2f}{status}")
@@ -0,0 +1,80 @@
+"""
+IRIS - Time stretching
+
+Changes how fast speech plays without changing its pitch, using
+WSOLA (waveform similarity overlap-add) on NumPy arrays. Each output
+frame is taken from near its nominal input position, shifted by the
+offset whose waveform best lines up with the previous frame, then
+overlap-added with a Hann window. This avoids the clicks and echoes
+of chunk-and-crossfade speedups and runs far faster than real time.
+"""
+
+import numpy as np #vectorised audio maths
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+DECIMATE = 4 #coarse search resolution in samples
+
+
+def time_stretch(audio, rate, speed, frame_ms=40, tolerance_ms=10):
+    #audio: mono samples (int16 or float), rate: sample rate
+    #speed: >1 plays faster (shorter output), <1 slower, pitch stays the same
+    #frame_ms: analysis frame length, about two pitch periods of a low voice or more
+    #tolerance_ms: how far a frame may move from its nominal position to line up
+    #returns an array of the same dtype as audio
+    if speed <= 0:
+        raise ValueError("speed must be positive")
+    if speed == 1.0 or len(audio) == 0:
+        return audio
+    dtype = audio.dtype
+    x = audio.astype(np.float32)
+
+    frame = int(rate * frame_ms / 1000)
+    hop_out = frame // 2 #50% overlap of hann windows adds up to a constant
+    hop_in = hop_out * speed
+    tolerance = int(rate * tolerance_ms / 1000)
+    window = np.hanning(frame).astype(np.float32)
+
+    n_frames = max(1, int((len(x) - frame) / hop_in) + 1) if len(x) > frame else 1
+    out_len = (n_frames - 1) * hop_out + frame
+    #padding so every candidate window, natural continuation and last frame is in range
+    pad = tolerance + frame + hop_out
+    x = np.concatenate((np.zeros(pad, np.float32), x, np.zeros(pad + frame, np.float32)))
+    out = np.zeros(out_len, np.float32)
+    norm = np.zeros(out_len, np.float32)
+    overlap = frame - hop_out
+
+    #the best offset is searched on a 4x decimated copy first, then refined on the full signal
+    #every candidate window is a view (no copies)
+    coarse = x[:len(x) // DECIMATE * DECIMATE].reshape(-1, DECIMATE).mean(axis=1)
+    coarse_candidates = sliding_window_view(coarse, overlap // DECIMATE)
+    candidates = sliding_window_view(x, overlap)
+    coarse_tolerance = tolerance // DECIMATE
+
+    previous = pad #input position of the previous frame (padded coordinates)
+    for k in range(n_frames):
+        nominal = pad + int(round(k * hop_in))
+        if k == 0:
+            start = nominal
+        else:
+            #the part of the signal that would have naturally followed the previous frame
+            natural = (previous + hop_out) // DECIMATE
+            template = coarse[natural:natural + overlap // DECIMATE]
+            lo = nominal // DECIMATE - coarse_tolerance
+            scores = coarse_candidates[lo:lo + 2 * coarse_tolerance + 1] @ template
+            guess = (lo + int(np.argmax(scores))) * DECIMATE
+            #refine around the coarse guess at full resolution
+            template = x[previous + hop_out:previous + hop_out + overlap]
+            lo = guess - DECIMATE
+            scores = candidates[lo:lo + 2 * DECIMATE + 1] @ template
+            start = lo + int(np.argmax(scores))
+        o = k * hop_out
+        out[o:o + frame] += x[start:start + frame] * window
+        norm[o:o + frame] += window
+        previous = start
+
+    out /= np.maximum(norm, 1e-3)
+    if np.issubdtype(dtype, np.integer):
+        info = np.iinfo(dtype)
+        return np.clip(np.round(out), info.min, info.max).astype(dtype)
+    return out.astype(dtype)
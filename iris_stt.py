@@ -0,0 +1,348 @@
+"""
+IRIS - Speech to text
+
+Keeps the Whisper model resident for the whole process so that
+IRIS does not pay the model loading cost on every utterance.
+The model is loaded once, can be warmed up in the background at
+startup and is shared by everything that needs a transcription.
+In server mode a BatchScheduler groups utterances from many sessions
+into batches for that one model.
+"""
+
+import collections #queue of utterances waiting for a batch
+import os #read model settings from the environment
+import threading #background warm up and locking around the model
+import time #batch deadlines
+from concurrent.futures import Future, InvalidStateError #result of a queued utterance
+import numpy as np #audio buffers
+
+from iris_audio import WHISPER_RATE, resample
+
+
+DEFAULT_MODEL = os.environ.get("IRIS_WHISPER_MODEL", "base.en") # base model to keep it fast but accurate
+DEFAULT_THREADS = int(os.environ.get("IRIS_WHISPER_THREADS", "0")) or None # None means let torch decide
+
+
+class WhisperRegistry:
+    """
+    The WhisperRegistry class holds one loaded Whisper model per
+    process. The first caller loads it, everyone else reuses it.
+    """
+    def __init__(self, model_name=DEFAULT_MODEL, threads=DEFAULT_THREADS, device="cpu"):
+        #model_name: whisper size such as tiny.en, base.en, small.en
+        #threads: number of torch compute threads, None keeps torch default
+        #device: cpu or cuda
+        self.model_name = model_name
+        self.threads = threads
+        self.device = device
+        self.model = None
+        self.ready = threading.Event() #set once the model is loaded and warmed up
+        self._load_lock = threading.Lock() #only one thread may load the model
+        self._infer_lock = threading.Lock() #whisper models are not safe to call from two threads at once
+        self._warm_thread = None
+
+    def configure(self, model_name=None, threads=None, device=None):
+        #change settings, only allowed before the model has been loaded
+        if self.model is not None:
+            raise RuntimeError("Whisper model already loaded, configure it before first use")
+        if model_name:
+            self.model_name = model_name
+        if threads:
+            self.threads = threads
+        if device:
+            self.device = device
+
+    def get(self):
+        #return the resident model, loading it on first use
+        if self.model is None:
+            with self._load_lock:
+                if self.model is None: #another thread may have loaded it while we waited
+                    import whisper # audio to text transcription
+                    if self.threads:
+                        import torch
+                        torch.set_num_threads(self.threads)
+                    self.model = whisper.load_model(self.model_name, device=self.device)
+        return self.model
+
+    def warm_up(self, background=True):
+        #load the model and run one tiny decode so the first real utterance is fast
+        #background=True returns right away and loads in a daemon thread
+        if self._warm_thread is not None:
+            return self._warm_thread
+        if not background:
+            self._warm()
+            return None
+        self._warm_thread = threading.Thread(target=self._warm, name="whisper-warmup", daemon=True)
+        self._warm_thread.start()
+        return self._warm_thread
+
+    def _warm(self):
+        try:
+            self.transcribe(np.zeros(16000, dtype=np.float32)) #one second of silence
+        except Exception as e:
+            # a failed warm up is not fatal, the real call will load it again and report the error
+            print("Error warming up whisper:", str(e))
+        finally:
+            self.ready.set()
+
+    def transcribe(self, audio, **options):
+        #audio: path to an audio file or 16 kHz float32 numpy array
+        #returns the transcribed text
+        return self.transcribe_result(audio, **options)["text"]
+
+    def transcribe_result(self, audio, **options):
+        #same as transcribe but returns whisper's full result with segments (and words if asked)
+        model = self.get()
+        options.setdefault("language", "en")
+        options.setdefault("fp16", self.device != "cpu") #fp16 is not supported on cpu
+        with self._infer_lock:
+            return model.transcribe(audio, **options)
+
+    def transcribe_batch(self, audios):
+        #audios: list of 16 kHz float32 arrays, returns their texts in the same order
+        #clips up to whisper's 30 s window are decoded together in one batched forward pass
+        #(greedy, no temperature fallback), longer ones go through transcribe one by one
+        import whisper
+        model = self.get()
+        texts = [""] * len(audios)
+        batched = [i for i, audio in enumerate(audios) if 0 < len(audio) <= whisper.audio.N_SAMPLES]
+        if batched:
+            import torch
+            mel = torch.stack([whisper.log_mel_spectrogram(whisper.pad_or_trim(np.asarray(audios[i], dtype=np.float32)),
+                                                           model.dims.n_mels) for i in batched]).to(model.device)
+            options = whisper.DecodingOptions(language="en", without_timestamps=True, fp16=self.device != "cpu")
+            with self._infer_lock:
+                results = whisper.decode(model, mel, options)
+            for i, result in zip(batched, results):
+                texts[i] = result.text
+        for i, audio in enumerate(audios):
+            if len(audio) > whisper.audio.N_SAMPLES:
+                texts[i] = self.transcribe(audio)
+        return texts
+
+
+#one registry for the whole process
+whisper_registry = WhisperRegistry()
+
+
+def _settle(setter, value):
+    #hand a result to a future, a future that is already done keeps what it has
+    try:
+        setter(value)
+    except InvalidStateError:
+        pass
+
+
+class Overloaded(Exception):
+    """Raised when the batch scheduler already has too many utterances waiting."""
+
+
+class BatchScheduler:
+    """
+    The BatchScheduler class lets many sessions share one resident Whisper
+    model. Utterances are queued and a worker thread decodes them in
+    batches: a batch goes as soon as max_batch utterances are waiting or
+    the oldest one has waited max_wait seconds. With max_pending
+    utterances already queued new ones are refused with Overloaded, so
+    clients back off instead of everyone's latency piling up.
+    """
+    def __init__(self, registry=None, max_batch=8, max_wait=0.05, max_pending=32):
+        #registry: anything with transcribe_batch(audios), whisper_registry by default
+        self.registry = registry or whisper_registry
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_pending = max_pending
+        self._pending = collections.deque() #(audio, future, queued at)
+        self._lock = threading.Lock()
+        self._has_work = threading.Condition(self._lock)
+        self._stopped = False
+        self.batch_sizes = []
+        self.queue_waits = [] #seconds each utterance waited for its batch
+        self.decode_times = [] #seconds per batch
+        self.rejected = 0
+        self._thread = threading.Thread(target=self._run, name="whisper-batcher", daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def submit(self, audio):
+        #queue one 16 kHz float32 utterance, returns a concurrent.futures.Future with its text
+        future = Future()
+        with self._lock:
+            if self._stopped:
+                raise RuntimeError("scheduler is stopped")
+            if len(self._pending) >= self.max_pending:
+                self.rejected += 1
+                raise Overloaded(f"{len(self._pending)} utterances already waiting")
+            self._pending.append((audio, future, time.perf_counter()))
+            self._has_work.notify()
+        return future
+
+    def _next_batch(self):
+        #wait for the first utterance, then up to max_wait for more, None once stopped and drained
+        with self._lock:
+            while True:
+                while not self._pending and not self._stopped:
+                    self._has_work.wait()
+                if not self._pending:
+                    return None
+                deadline = self._pending[0][2] + self.max_wait
+                while len(self._pending) < self.max_batch and not self._stopped:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._has_work.wait(remaining)
+                taken = [self._pending.popleft() for _ in range(min(self.max_batch, len(self._pending)))]
+                #utterances whose session went away in the meantime are not decoded
+                batch = [item for item in taken if item[1].set_running_or_notify_cancel()]
+                if batch:
+                    return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            started = time.perf_counter()
+            try:
+                texts = self.registry.transcribe_batch([audio for audio, _, _ in batch])
+            except Exception as e:
+                for _, future, _ in batch:
+                    _settle(future.set_exception, e)
+            else:
+                for (_, future, _), text in zip(batch, texts):
+                    _settle(future.set_result, text)
+            self.decode_times.append(time.perf_counter() - started)
+            self.batch_sizes.append(len(batch))
+            self.queue_waits.extend(started - queued for _, _, queued in batch)
+
+    def stop(self):
+        #finish what is queued, then end the worker thread
+        with self._lock:
+            self._stopped = True
+            self._has_work.notify()
+        self._thread.join()
+
+    def report(self):
+        #batching statistics, ready for json
+        from iris_metrics import summarize
+        sizes = list(self.batch_sizes)
+        return {
+            "batches": len(sizes),
+            "utterances": int(sum(sizes)),
+            "rejected": self.rejected,
+            "mean_batch_size": round(sum(sizes) / len(sizes), 2) if sizes else 0.0,
+            "max_batch_size": max(sizes, default=0),
+            "queue_wait": summarize(self.queue_waits),
+            "decode": summarize(self.decode_times),
+        }
+
+
+def _normalise(word):
+    #compare words without case, spaces and punctuation
+    return word.strip().lower().strip(".,!?;:\"'")
+
+
+class StreamingTranscriber:
+    """
+    The StreamingTranscriber class transcribes while the user is still speaking.
+    Audio is fed in as it is captured, a background thread decodes a window
+    starting at the last committed word every `step` seconds, and words that
+    two consecutive decodes agree on are committed for good. When the user
+    stops only the uncommitted tail has to be decoded again.
+    """
+    def __init__(self, rate=WHISPER_RATE, registry=None, step=1.0, max_window=15.0, keep_tail=2.0, on_partial=None):
+        #rate: sample rate of the audio that will be fed in
+        #step: seconds of new audio between two background decodes
+        #max_window: if nothing gets agreed for this long, commit everything but the last keep_tail seconds
+        #on_partial: called as on_partial(committed_text, tentative_text) after every decode
+        self.rate = rate
+        self.registry = registry or whisper_registry
+        self.step = step
+        self.max_window = max_window
+        self.keep_tail = keep_tail
+        self.on_partial = on_partial
+        self._data = np.zeros(rate * 30, dtype=np.float32) #grows by doubling, only written past self.samples
+        self.samples = 0
+        self.committed = "" #text that will not change anymore
+        self._commit_sample = 0 #where the next decode window starts
+        self._previous = [] #uncommitted words from the last decode
+        self._lock = threading.Lock()
+        self._new_audio = threading.Condition(self._lock)
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="whisper-stream", daemon=True)
+        self._thread.start()
+
+    def feed(self, audio):
+        #audio: float32 mono samples at self.rate
+        with self._lock:
+            needed = self.samples + len(audio)
+            if needed > len(self._data):
+                grown = np.zeros(max(needed, 2 * len(self._data)), dtype=np.float32)
+                grown[:self.samples] = self._data[:self.samples]
+                self._data = grown
+            self._data[self.samples:needed] = audio
+            self.samples = needed
+            self._new_audio.notify()
+
+    def _window(self):
+        #current uncommitted audio, resampled for whisper
+        with self._lock:
+            window = self._data[self._commit_sample:self.samples]
+        return resample(window, self.rate, WHISPER_RATE)
+
+    def _run(self):
+        decoded_until = 0
+        while True:
+            with self._lock:
+                while not self._stopped and self.samples - decoded_until < self.step * self.rate:
+                    self._new_audio.wait()
+                if self._stopped:
+                    return
+                decoded_until = self.samples
+            try:
+                self._decode_partial()
+            except Exception as e:
+                # keep recording even if one partial decode fails, finish() decodes the tail anyway
+                print("Error during streaming transcription:", str(e))
+
+    def _decode_partial(self):
+        window = self._window()
+        result = self.registry.transcribe_result(window, word_timestamps=True,
+                                                 condition_on_previous_text=False,
+                                                 initial_prompt=self.committed[-200:] or None)
+        words = [(w["word"], w["end"]) for seg in result["segments"] for w in seg.get("words", [])]
+
+        #local agreement: words both decodes agree on, from the start of the window, are stable
+        agreed = 0
+        while (agreed < min(len(words), len(self._previous))
+               and _normalise(words[agreed][0]) == _normalise(self._previous[agreed][0])):
+            agreed += 1
+        if agreed == 0 and len(window) > self.max_window * WHISPER_RATE:
+            #no agreement for too long, force out everything except the most recent audio
+            limit = len(window) / WHISPER_RATE - self.keep_tail
+            while agreed < len(words) and words[agreed][1] <= limit:
+                agreed += 1
+
+        if agreed:
+            self.committed += "".join(word for word, _ in words[:agreed])
+            with self._lock:
+                self._commit_sample += int(words[agreed - 1][1] * self.rate)
+        self._previous = words[agreed:]
+        if self.on_partial is not None:
+            self.on_partial(self.committed.strip(), "".join(word for word, _ in self._previous).strip())
+
+    def finish(self):
+        #stop the background decodes, decode the remaining tail and return the full transcript
+        with self._lock:
+            self._stopped = True
+            self._new_audio.notify()
+        self._thread.join()
+        tail = ""
+        window = self._window()
+        if len(window) > WHISPER_RATE // 10: #anything shorter than 0.1 s is not worth a decode
+            tail = self.registry.transcribe(window, condition_on_previous_text=False,
+                                            initial_prompt=self.committed[-200:] or None)
+        return (self.committed + tail).strip()
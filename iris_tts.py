@@ -0,0 +1,331 @@
+"""
+IRIS - Text to speech
+
+Speaks a reply sentence by sentence. While one sentence is playing the
+next one is already being synthesized on a worker thread, so the first
+sound comes out as soon as the first sentence is ready instead of after
+the whole reply. Audio stays in memory as PCM and is played through one
+persistent pygame mixer channel, no mp3 files are written.
+"""
+
+import collections #OrderedDict for the in memory LRU
+import hashlib #cache keys
+import io #in memory file for gTTS output
+import os #on disk cache files
+import queue #hand synthesized sentences from the worker to the player
+import re #split replies into sentences
+import threading #synthesize the next sentence while the current one plays
+import time #polling the mixer channel
+import numpy as np #PCM buffers
+
+from iris_audio import resample
+from iris_stretch import time_stretch
+
+
+MIXER_RATE = 24000 #gTTS speaks at 24 kHz mono, so the mixer runs at that rate and rarely needs to resample
+RENDER_VERSION = "wsola-1" #part of the cache key, change it when rendering changes so old audio is not reused
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_sentences(text, min_chars=20):
+    #split a reply into sentences, very short pieces are glued to the next one
+    #so we don't pay a synthesis round trip for "Oh." or "Hi!"
+    sentences = []
+    current = ""
+    for piece in _SENTENCE_END.split(text.strip()):
+        current = f"{current} {piece}".strip()
+        if len(current) >= min_chars:
+            sentences.append(current)
+            current = ""
+    if current:
+        if sentences and len(current) < min_chars:
+            sentences[-1] = f"{sentences[-1]} {current}"
+        else:
+            sentences.append(current)
+    return sentences
+
+
+class SentenceStream:
+    """
+    The SentenceStream class cuts streamed LLM text into sentences as it
+    arrives, so the first sentence can be spoken before the reply is done.
+    """
+    def __init__(self, min_chars=20):
+        self.min_chars = min_chars
+        self.buffer = ""
+
+    def feed(self, chunk):
+        #add streamed text, returns the sentences that are complete now
+        self.buffer += chunk
+        sentences = []
+        while True:
+            #a sentence is complete once whitespace follows its full stop, and it is long enough
+            ends = [m.end() for m in _SENTENCE_END.finditer(self.buffer) if m.start() >= self.min_chars]
+            if not ends:
+                return sentences
+            sentences.append(self.buffer[:ends[0]].strip())
+            self.buffer = self.buffer[ends[0]:]
+
+    def flush(self):
+        #whatever is left once the reply has ended
+        rest, self.buffer = self.buffer.strip(), ""
+        return [rest] if rest else []
+
+
+def gtts_synthesize(text, voice="en"):
+    #synthesize text with google text to speech and decode it in memory
+    #returns (int16 mono samples, sample rate)
+    from gtts import gTTS #text to speach
+    from pydub import AudioSegment #mp3 decoding
+    mp3 = io.BytesIO()
+    gTTS(text, lang=voice).write_to_fp(mp3)
+    mp3.seek(0)
+    segment = AudioSegment.from_file(mp3, format="mp3").set_channels(1).set_sample_width(2)
+    return np.array(segment.get_array_of_samples(), dtype=np.int16), segment.frame_rate
+
+
+class SpeechCache:
+    """
+    The SpeechCache class keeps playback ready PCM for text that was
+    already spoken, keyed by (text, voice, speed). Recent entries stay in
+    memory (least recently used are dropped first) and everything is also
+    written to a folder on disk that is trimmed to a byte budget, oldest
+    first, so fixed phrases survive restarts.
+    """
+    def __init__(self, memory_bytes=32 * 1024 * 1024, disk_dir=None, disk_bytes=256 * 1024 * 1024):
+        #memory_bytes: budget for the in memory tier
+        #disk_dir: folder for the on disk tier, None keeps the cache in memory only
+        #disk_bytes: budget for the on disk tier
+        self.memory_bytes = memory_bytes
+        self.disk_dir = disk_dir
+        self.disk_bytes = disk_bytes
+        self._memory = collections.OrderedDict()
+        self._memory_used = 0
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def key(text, voice, speed):
+        #same words with different spacing should hit the same entry
+        text = " ".join(text.split())
+        return hashlib.sha256(f"{RENDER_VERSION}|{voice}|{speed}|{text}".encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, key + ".npy")
+
+    def get(self, key):
+        #returns the cached int16 samples or None
+        with self._lock:
+            pcm = self._memory.get(key)
+            if pcm is not None:
+                self._memory.move_to_end(key)
+                return pcm
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            pcm = np.load(path)
+            os.utime(path) #mark as recently used for disk eviction
+        except (OSError, ValueError):
+            return None
+        self._remember(key, pcm)
+        return pcm
+
+    def put(self, key, pcm):
+        self._remember(key, pcm)
+        if self.disk_dir:
+            self._write(key, pcm)
+
+    def _remember(self, key, pcm):
+        if pcm.nbytes > self.memory_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_used -= old.nbytes
+            self._memory[key] = pcm
+            self._memory_used += pcm.nbytes
+            while self._memory_used > self.memory_bytes:
+                _, dropped = self._memory.popitem(last=False)
+                self._memory_used -= dropped.nbytes
+
+    def _write(self, key, pcm):
+        path = self._path(key)
+        temp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp, "wb") as f:
+                np.save(f, pcm)
+            os.replace(temp, path) #readers never see a half written file
+            self._evict_disk()
+        except OSError as e:
+            # the disk tier is only an optimisation, keep going without it
+            print("Error writing speech cache:", str(e))
+
+    def _evict_disk(self):
+        #delete least recently used files until the folder fits the budget
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            if name.endswith(".npy"):
+                stat = os.stat(os.path.join(self.disk_dir, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        used = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if used <= self.disk_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.disk_dir, name))
+            except OSError:
+                pass
+            used -= size
+
+
+class SpeechPipeline:
+    """
+    The SpeechPipeline class turns text into speech with synthesis of
+    sentence N+1 overlapped with playback of sentence N.
+    """
+    def __init__(self, synthesize=gtts_synthesize, voice="en", speed=1.25, lookahead=2, cache=None):
+        #synthesize: function (text, voice) -> (int16 samples, rate)
+        #voice: language / voice passed to synthesize
+        #speed: default playback speed factor for the session, speak() can override it per call
+        #lookahead: how many sentences may be synthesized ahead of playback
+        #cache: SpeechCache for rendered sentences, None renders every time
+        self.synthesize = synthesize
+        self.voice = voice
+        self.speed = speed
+        self.lookahead = lookahead
+        self.cache = cache
+        self.channel = None
+        self.mixer_rate = MIXER_RATE #what the mixer actually opened with, Sound buffers must be in this format
+        self.mixer_channels = 1
+        self._stop = threading.Event()
+        self._mixer_lock = threading.Lock()
+
+    def init_mixer(self):
+        #the mixer is opened once and kept for the whole session
+        #allowedchanges=0 makes SDL convert to the device instead of opening it at another rate or channel count
+        with self._mixer_lock:
+            if self.channel is None:
+                import pygame # audio playback
+                pygame.mixer.init(frequency=MIXER_RATE, size=-16, channels=1, allowedchanges=0)
+                #someone else may have opened the mixer first, then its format wins
+                self.mixer_rate, _, self.mixer_channels = pygame.mixer.get_init()
+                self.channel = pygame.mixer.Channel(0)
+        return self.channel
+
+    def to_mixer_format(self, pcm):
+        #MIXER_RATE mono int16 samples -> the bytes layout the mixer plays
+        if self.mixer_rate != MIXER_RATE:
+            pcm = np.clip(resample(pcm.astype(np.float32), MIXER_RATE, self.mixer_rate), -32768, 32767).astype(np.int16)
+        if self.mixer_channels > 1:
+            pcm = np.repeat(pcm[:, None], self.mixer_channels, axis=1) #same sound on every channel, interleaved
+        return np.ascontiguousarray(pcm, dtype=np.int16)
+
+    def render(self, text, speed=None):
+        #text -> int16 samples at MIXER_RATE ready to play, from the cache when possible
+        speed = speed or self.speed
+        key = None
+        if self.cache is not None:
+            key = SpeechCache.key(text, self.voice, speed)
+            pcm = self.cache.get(key)
+            if pcm is not None:
+                return pcm
+        pcm, rate = self.synthesize(text, self.voice)
+        pcm = time_stretch(pcm, rate, speed) #faster speech to make it more humane, same pitch
+        if rate != MIXER_RATE:
+            pcm = np.clip(resample(pcm.astype(np.float32), rate, MIXER_RATE), -32768, 32767).astype(np.int16)
+        if key is not None:
+            self.cache.put(key, pcm)
+        return pcm
+
+    def prerender(self, phrases, background=True):
+        #render fixed phrases into the cache so they play instantly later
+        def work():
+            for phrase in phrases:
+                for sentence in split_sentences(phrase):
+                    try:
+                        self.render(sentence)
+                    except Exception as e:
+                        print("Error pre-rendering speech:", str(e))
+        if not background:
+            work()
+            return None
+        thread = threading.Thread(target=work, name="tts-prerender", daemon=True)
+        thread.start()
+        return thread
+
+    def _produce(self, sentences, speed, ready):
+        #worker thread, synthesizes sentences in order and hands them to the player
+        try:
+            for sentence in sentences:
+                if self._stop.is_set():
+                    break
+                ready.put(self.render(sentence, speed))
+        except Exception as e:
+            ready.put(e)
+        finally:
+            ready.put(None) #end of reply
+
+    def enqueue(self, pcm, cancel=None):
+        #play rendered samples right after whatever is playing now, so there is no gap between them
+        #blocks only while another sentence is already waiting in the channel queue
+        #cancel: threading.Event that makes it give up waiting
+        import pygame
+        cancel = cancel or self._stop
+        channel = self.init_mixer()
+        sound = pygame.mixer.Sound(buffer=self.to_mixer_format(pcm).tobytes())
+        while channel.get_queue() is not None and not cancel.is_set():
+            time.sleep(0.01)
+        if cancel.is_set():
+            return
+        if channel.get_busy():
+            channel.queue(sound)
+        else:
+            channel.play(sound)
+
+    def wait_done(self, cancel=None):
+        #wait until the channel has played everything queued on it
+        cancel = cancel or self._stop
+        channel = self.init_mixer()
+        while channel.get_busy() and not cancel.is_set():
+            time.sleep(0.01)
+
+    @property
+    def busy(self):
+        #True while something is playing
+        return self.channel is not None and self.channel.get_busy()
+
+    def speak(self, text, speed=None):
+        #speak the whole text, returns when playback has finished or stop() was called
+        #speed: playback speed for this reply only, None uses the session speed
+        self._stop.clear()
+        channel = self.init_mixer()
+        ready = queue.Queue(maxsize=self.lookahead)
+        worker = threading.Thread(target=self._produce, args=(split_sentences(text), speed, ready), daemon=True)
+        worker.start()
+        try:
+            while True:
+                pcm = ready.get()
+                if pcm is None or self._stop.is_set():
+                    break
+                if isinstance(pcm, Exception):
+                    raise pcm
+                self.enqueue(pcm)
+            self.wait_done()
+        finally:
+            if self._stop.is_set():
+                channel.stop()
+            self._stop.set() #lets the worker exit if we left early
+            while worker.is_alive(): #unblock a worker waiting on a full queue
+                try:
+                    ready.get_nowait()
+                except queue.Empty:
+                    worker.join(0.05)
+
+    def stop(self):
+        #stop speaking right away, safe to call from another thread
+        self._stop.set()
+        if self.channel is not None:
+            self.channel.stop()
@@ -0,0 +1,52 @@
+import numpy as np
+
+from iris_audio import EnergyVAD, trim_silence
+
+RATE = 48000
+CHUNK = 1024
+
+
+def voiced(seconds, rate=RATE):
+    #a vowel like sound: 150 Hz with a few harmonics, about -20 dBFS
+    t = np.arange(int(seconds * rate)) / rate
+    return sum(0.1 / k * np.sin(2 * np.pi * 150 * k * t) for k in range(1, 5)).astype(np.float32)
+
+
+def silence(seconds, rate=RATE, level=1e-4):
+    return (level * np.random.default_rng(0).standard_normal(int(seconds * rate))).astype(np.float32)
+
+
+def run_chunks(vad, audio):
+    return [vad.process(audio[i:i + CHUNK]) for i in range(0, len(audio) - CHUNK + 1, CHUNK)]
+
+
+def test_vad_detects_speech_that_starts_with_the_recording():
+    #the user is already talking when recording starts, the noise floor must not lock onto their voice
+    vad = EnergyVAD(RATE)
+    speech_chunks = int(3 * RATE / CHUNK)
+    flags = run_chunks(vad, np.concatenate((voiced(3), silence(2))))
+    assert vad.speech_seen
+    assert sum(flags[:speech_chunks]) > 0.9 * speech_chunks
+    assert vad.silence >= 1.2 #long enough for auto stop
+
+
+def test_vad_detects_speech_after_silence():
+    vad = EnergyVAD(RATE)
+    flags = run_chunks(vad, np.concatenate((silence(0.5), voiced(1), silence(1))))
+    quiet_chunks = int(0.5 * RATE / CHUNK)
+    assert not any(flags[:quiet_chunks])
+    assert vad.speech_seen
+    assert vad.silence > 0.5
+
+
+def test_vad_ignores_silence_and_hiss():
+    vad = EnergyVAD(RATE)
+    hiss = (0.05 * np.random.default_rng(1).standard_normal(RATE)).astype(np.float32) #loud but crosses zero constantly
+    assert not any(run_chunks(vad, np.concatenate((silence(1), hiss))))
+    assert not vad.speech_seen
+
+
+def test_trim_silence_keeps_padded_speech():
+    audio = np.concatenate((silence(1), voiced(1), silence(1)))
+    trimmed = trim_silence(audio, RATE, pad_ms=200)
+    assert abs(len(trimmed) / RATE - 1.4) < 0.05
@@ -0,0 +1,39 @@
+import numpy as np
+
+from iris_stt import BatchScheduler
+
+
+class EchoRegistry:
+    #"transcribes" an utterance to its length
+    def __init__(self):
+        self.batches = []
+
+    def transcribe_batch(self, audios):
+        self.batches.append(len(audios))
+        return [str(len(audio)) for audio in audios]
+
+
+def test_cancelled_submit_does_not_stop_the_batcher():
+    #a session that hangs up cancels its future while it is still queued
+    registry = EchoRegistry()
+    scheduler = BatchScheduler(registry, max_batch=4, max_wait=0.2)
+    try:
+        cancelled = scheduler.submit(np.zeros(100, dtype=np.float32))
+        assert cancelled.cancel()
+        assert scheduler.submit(np.zeros(200, dtype=np.float32)).result(timeout=5) == "200"
+        assert scheduler._thread.is_alive()
+        assert scheduler.submit(np.zeros(300, dtype=np.float32)).result(timeout=5) == "300"
+        assert sum(registry.batches) == 2 #the cancelled one was never decoded
+    finally:
+        scheduler.stop()
+
+
+def test_batches_fill_up_to_max_batch():
+    registry = EchoRegistry()
+    scheduler = BatchScheduler(registry, max_batch=3, max_wait=0.5)
+    try:
+        futures = [scheduler.submit(np.zeros(n, dtype=np.float32)) for n in (1, 2, 3)]
+        assert [future.result(timeout=5) for future in futures] == ["1", "2", "3"]
+        assert registry.batches == [3]
+    finally:
+        scheduler.stop()
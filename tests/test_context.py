@@ -0,0 +1,38 @@
+import threading
+
+from iris_context import ConversationContext, estimate_tokens
+
+
+def test_recent_messages_stay_within_budget_and_older_ones_are_summarized():
+    context = ConversationContext(budget=60, summary_budget=40)
+    for i in range(10):
+        context.add('user', f"This is message number {i} from me, about my day at work.")
+        context.add('AI', f"Thanks for telling me about message {i}. How did it make you feel?")
+    messages = context.messages()
+    assert sum(estimate_tokens(m['content']) for m in messages) <= 60
+    assert messages[0]['author'] == 'user'
+    assert "message number 9" in messages[-2]['content']
+    assert estimate_tokens(context.summary) <= 40
+    assert "What we talked about earlier" in context.context_prompt("base")
+
+
+def test_newest_messages_are_kept_even_over_budget():
+    context = ConversationContext(budget=5, min_recent=2)
+    context.add('user', "a long message " * 20)
+    context.add('AI', "a long reply " * 20)
+    assert len(context.messages()) == 2
+    assert context.context_prompt("base") == "base"
+
+
+def test_failed_llm_summary_keeps_the_extractive_summary():
+    done = threading.Event()
+
+    def summarize(previous, folded):
+        done.set()
+        raise RuntimeError("offline")
+
+    context = ConversationContext(budget=20, summary_budget=100, summarize=summarize)
+    for i in range(4):
+        context.add('user', f"I went to the park on day {i} and it rained.")
+    assert done.wait(2)
+    assert "day 0" in context.summary
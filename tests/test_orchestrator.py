@@ -0,0 +1,90 @@
+import asyncio
+import threading
+
+import pytest
+
+from iris_orchestrator import ConversationOrchestrator
+
+
+class FakeSpeech:
+    #plays every sentence "forever", until the turn is cancelled
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.played = []
+        self.spoken = []
+        self.stopped = False
+        self.talking = threading.Event()
+
+    def render(self, sentence):
+        return sentence
+
+    def enqueue(self, pcm, cancel):
+        if self.fail:
+            raise RuntimeError("mixer not initialized")
+        self.played.append(pcm)
+        self.talking.set()
+        cancel.wait(5)
+
+    def wait_done(self, cancel):
+        cancel.wait(5)
+
+    def stop(self):
+        self.stopped = True
+
+    def speak(self, text):
+        self.spoken.append(text)
+
+
+class ScriptedCapture:
+    #returns the scripted utterances, then waits for the user until cancelled
+    def __init__(self, script):
+        self.script = list(script)
+        self.cancelled = threading.Event()
+
+    def __call__(self, on_speech_start):
+        if not self.script:
+            self.cancelled.wait(5)
+            return None
+        step = self.script.pop(0)
+        if isinstance(step, Exception):
+            raise step
+        text, wait_for = step
+        if wait_for is not None:
+            assert wait_for.wait(5)
+        on_speech_start()
+        return text
+
+
+def run(orchestrator):
+    asyncio.run(asyncio.wait_for(orchestrator.run(), timeout=5))
+
+
+def make(capture, speech):
+    return ConversationOrchestrator(capture=capture, transcribe=lambda text: text,
+                                    chat=lambda text: iter(["Hi there, it is good to hear from you. ", "How was your day?"]), speech=speech,
+                                    is_goodbye=lambda text: text == "bye", farewell="Goodbye",
+                                    cancel_capture=capture.cancelled.set)
+
+
+def test_new_speech_interrupts_the_reply():
+    speech = FakeSpeech()
+    capture = ScriptedCapture([("hello", None), ("bye", speech.talking)]) #speaks up while IRIS is talking
+    orchestrator = make(capture, speech)
+    run(orchestrator)
+    assert speech.stopped
+    assert speech.played == ["Hi there, it is good to hear from you."] #the rest of the reply was dropped
+    assert speech.spoken == ["Goodbye"]
+    assert capture.cancelled.is_set()
+
+
+def test_failing_capture_ends_the_conversation():
+    capture = ScriptedCapture([RuntimeError("no keyboard")])
+    with pytest.raises(RuntimeError, match="no keyboard"):
+        run(make(capture, FakeSpeech()))
+    assert capture.cancelled.is_set()
+
+
+def test_failing_playback_ends_the_conversation():
+    capture = ScriptedCapture([("hello", None)])
+    with pytest.raises(RuntimeError, match="mixer"):
+        run(make(capture, FakeSpeech(fail=True)))
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from iris_audio import RingBuffer
+
+
+def test_write_returns_positions_and_view_reads_them_back():
+    ring = RingBuffer(8)
+    assert ring.write(np.arange(3, dtype=np.int16)) == (0, 3)
+    assert ring.write(np.arange(3, 6, dtype=np.int16)) == (3, 6)
+    assert ring.view(1, 5).tolist() == [1, 2, 3, 4]
+
+
+def test_view_across_the_wrap():
+    ring = RingBuffer(8)
+    ring.write(np.arange(6, dtype=np.int16))
+    start, end = ring.write(np.arange(6, 10, dtype=np.int16))
+    assert (start, end) == (6, 10)
+    assert ring.view(4, 10).tolist() == [4, 5, 6, 7, 8, 9]
+
+
+def test_overwritten_samples_are_refused():
+    ring = RingBuffer(8)
+    ring.write(np.arange(12, dtype=np.int16))
+    with pytest.raises(ValueError):
+        ring.view(2, 6)
+    assert ring.view(4, 12).tolist() == list(range(4, 12))
+
+
+def test_write_longer_than_capacity_keeps_the_newest():
+    ring = RingBuffer(4)
+    assert ring.write(np.arange(10, dtype=np.int16)) == (6, 10)
+    assert ring.view(6, 10).tolist() == [6, 7, 8, 9]
+
+
+def test_reset_starts_over():
+    ring = RingBuffer(4)
+    ring.write(np.arange(3, dtype=np.int16))
+    ring.reset()
+    assert ring.write(np.array([7], dtype=np.int16)) == (0, 1)
+    assert ring.view(0, 1).tolist() == [7]
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from iris_stretch import time_stretch
+
+RATE = 24000
+
+
+def tone(seconds, freq=220.0):
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (8000 * np.sin(2 * np.pi * freq * t)).astype(np.int16)
+
+
+@pytest.mark.parametrize("speed", [0.8, 1.25, 1.5])
+def test_length_scales_with_speed(speed):
+    audio = tone(2.0)
+    out = time_stretch(audio, RATE, speed)
+    assert out.dtype == np.int16
+    assert abs(len(out) - len(audio) / speed) < 0.05 * RATE
+
+
+def test_pitch_is_kept():
+    out = time_stretch(tone(2.0, 220.0), RATE, 1.25).astype(np.float64)
+    middle = out[len(out) // 4:3 * len(out) // 4]
+    spectrum = np.abs(np.fft.rfft(middle * np.hanning(len(middle))))
+    peak = np.argmax(spectrum) * RATE / len(middle)
+    assert abs(peak - 220.0) < 5.0
+
+
+def test_speed_one_and_empty_are_unchanged():
+    audio = tone(0.5)
+    assert time_stretch(audio, RATE, 1.0) is audio
+    assert len(time_stretch(audio[:0], RATE, 1.25)) == 0
+
+
+def test_bad_speed():
+    with pytest.raises(ValueError):
+        time_stretch(tone(0.1), RATE, 0)
@@ -0,0 +1,36 @@
+import numpy as np
+
+from iris_tts import MIXER_RATE, SentenceStream, SpeechPipeline, split_sentences
+
+
+def test_split_sentences_glues_short_pieces():
+    assert split_sentences("Oh. I am so glad you told me that. Hi!") == ["Oh. I am so glad you told me that. Hi!"]
+    assert split_sentences("That sounds really hard for you. What happened next after that?") == [
+        "That sounds really hard for you.", "What happened next after that?"]
+
+
+def test_sentence_stream_emits_sentences_as_they_complete():
+    stream = SentenceStream()
+    reply = "That sounds really hard for you. What happened next after that?"
+    sentences = []
+    for i in range(0, len(reply), 5): #tokens arrive in small pieces
+        sentences += stream.feed(reply[i:i + 5])
+    assert sentences == ["That sounds really hard for you."]
+    assert stream.flush() == ["What happened next after that?"]
+    assert stream.flush() == []
+
+
+def test_sentence_stream_waits_for_whitespace_after_the_full_stop():
+    stream = SentenceStream()
+    assert stream.feed("It costs about 3.") == []
+    assert stream.feed("5 dollars, which is fine by me. ") == ["It costs about 3.5 dollars, which is fine by me."]
+
+
+def test_samples_match_the_format_the_mixer_opened_with():
+    speech = SpeechPipeline(synthesize=None)
+    pcm = (1000 * np.sin(np.arange(MIXER_RATE) / 10)).astype(np.int16) #one second
+    assert speech.to_mixer_format(pcm).tobytes() == pcm.tobytes()
+    speech.mixer_rate, speech.mixer_channels = 48000, 2 #the device would not do 24 kHz mono
+    out = speech.to_mixer_format(pcm)
+    assert out.dtype == np.int16 and out.shape == (48000, 2)
+    assert np.array_equal(out[:, 0], out[:, 1])